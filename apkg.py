@@ -0,0 +1,71 @@
+import itertools
+import json
+import os
+import sqlite3
+import subprocess
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import genanki
+
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # Earliest date a zip entry can hold
+
+
+def reproducible_timestamp() -> float:
+    """Build timestamp from SOURCE_DATE_EPOCH, or else the time of the last git commit.
+
+    Anki only updates an existing note on import when the incoming one was
+    modified later, so the timestamp has to move forward with the content.
+    See https://reproducible-builds.org/specs/source-date-epoch/
+    """
+    if 'SOURCE_DATE_EPOCH' in os.environ:
+        return float(os.environ['SOURCE_DATE_EPOCH'])
+    try:
+        result = subprocess.run(['git', 'log', '-1', '--format=%ct'], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, check=True)
+        return float(result.stdout)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        raise ValueError("Reproducible builds need SOURCE_DATE_EPOCH set, or a git checkout with at least one "
+                         "commit to take the timestamp from") from None
+
+
+def _write_entry(outzip: zipfile.ZipFile, name: str, data: bytes) -> None:
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    info.create_system = 3  # Unix, regardless of the build machine
+    info.external_attr = 0o100644 << 16  # Regular file, rw-r--r--
+    outzip.writestr(info, data)
+
+
+def write_package(package: genanki.Package, path: str | Path, reproducible: bool = False,
+                  timestamp: Optional[float] = None) -> None:
+    """Write a package like genanki.Package.write_to_file, optionally byte-for-byte reproducibly.
+
+    A reproducible package is stamped with SOURCE_DATE_EPOCH (or the last
+    commit time), which also fixes the note and card IDs genanki derives from it.
+    Media are deduplicated and numbered in filename order, and every zip
+    entry gets the same date and permissions.
+    """
+    if not reproducible:
+        package.write_to_file(str(path), timestamp)
+        return
+
+    if timestamp is None:
+        timestamp = reproducible_timestamp()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / 'collection.anki2'
+        connection = sqlite3.connect(db_path)
+        try:
+            package.write_to_db(connection.cursor(), timestamp, itertools.count(int(timestamp * 1000)))
+            connection.commit()
+        finally:
+            connection.close()
+
+        media = sorted({os.path.basename(file): file for file in package.media_files}.items())
+        with zipfile.ZipFile(path, 'w') as outzip:
+            _write_entry(outzip, 'collection.anki2', db_path.read_bytes())
+            _write_entry(outzip, 'media', json.dumps({str(index): name for index, (name, _) in enumerate(media)}).encode())
+            for index, (_, file) in enumerate(media):
+                with open(file, 'rb') as f:
+                    _write_entry(outzip, str(index), f.read())
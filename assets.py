@@ -0,0 +1,109 @@
+import hashlib
+import os
+import re
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Sequence
+
+from delta import file_digest
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')  # Space before a colon can be a descendant combinator, e.g. `div :hover`
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and collapse whitespace around CSS punctuation.
+
+    Quoted strings containing these characters, e.g. in `content:`, are not
+    preserved, which none of the deck stylesheets use.
+    """
+    css = _CSS_COMMENT.sub('', css)
+    css = _CSS_SPACE.sub(' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    css = _CSS_COLON.sub(':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js: str) -> str:
+    """Strip comments and indentation from JavaScript, keeping line breaks.
+
+    Line breaks are kept so automatic semicolon insertion still applies.
+    String literals are skipped over; regular expression literals are not
+    recognised, so scripts must not contain `//` or `/*` inside one.
+    """
+    out = []
+    i = 0
+    length = len(js)
+    while i < length:
+        char = js[i]
+        if char in '"\'`':
+            end = i + 1
+            while end < length and js[end] != char:
+                end += 2 if js[end] == '\\' else 1
+            out.append(js[i:end + 1])
+            i = end + 1
+        elif js.startswith('//', i):
+            end = js.find('\n', i)
+            i = length if end == -1 else end
+        elif js.startswith('/*', i):
+            end = js.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+        else:
+            out.append(char)
+            i += 1
+    lines = (line.strip() for line in ''.join(out).splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def write_asset(content: str, suffix: str, stem: str, directory: Path) -> Path:
+    """Minify an asset and write it as `_{stem}.{hash}{suffix}`.
+
+    The leading underscore stops Anki's Check Media from treating the file
+    as unused, and the content hash in the name lets webviews cache it
+    until the content changes.
+    """
+    if suffix not in MINIFIERS:
+        raise ValueError(f"Unsupported asset type: {suffix}. Expected one of {list(MINIFIERS)}")
+
+    minified = MINIFIERS[suffix](content)
+    digest = hashlib.sha1(minified.encode()).hexdigest()[:10]
+    path = directory / f'_{stem}.{digest}{suffix}'
+    if not path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        path.write_text(minified, encoding='utf-8')
+    return path
+
+
+def content_hashed_media(media_files: Sequence[str], directory: Path) -> dict[str, Path]:
+    """Link media files into directory as `{stem}.{hash}{suffix}`, returning the new path per original name.
+
+    Files with identical content share one name, taken from the first of
+    them in sorted order so it does not depend on the order they were
+    added. Names starting with an underscore are shared assets, which are
+    already content-hashed and are left out. Files are copied where hard
+    links are not supported.
+    """
+    by_digest: dict[str, list[Path]] = defaultdict(list)
+    for file in dict.fromkeys(media_files):
+        path = Path(file)
+        if not path.name.startswith('_'):
+            by_digest[file_digest(path)].append(path)
+
+    directory.mkdir(parents=True, exist_ok=True)
+    hashed = {}
+    for digest, paths in by_digest.items():
+        first = min(paths, key=lambda path: path.name)
+        target = directory / f'{first.stem}.{digest[:12]}{first.suffix}'
+        if not target.exists():
+            try:
+                os.link(first, target)
+            except OSError:
+                shutil.copyfile(first, target)
+        hashed.update((path.name, target) for path in paths)
+    return hashed
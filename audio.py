@@ -0,0 +1,105 @@
+import hashlib
+from dataclasses import dataclass
+from math import gcd
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Output format -> libsndfile subtype; MP3 stays the default for AnkiWeb playback
+AUDIO_FORMATS = {
+    'mp3': None,
+    'ogg': 'VORBIS',
+    'opus': 'OPUS',
+}
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def encode_pcm(samples: np.ndarray, sample_rate: int, filepath: str | Path, audio_format: str = 'mp3',
+               bitrate: Optional[str] = None) -> None:
+    """Encode mono 16-bit PCM to a file in the requested format.
+
+    MP3 goes through pydub and an ffmpeg process; Ogg Vorbis and Opus are
+    encoded in-process with libsndfile.
+    """
+    if audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format: {audio_format}. Expected one of {list(AUDIO_FORMATS)}")
+
+    if audio_format == 'mp3':
+        from pydub import AudioSegment
+
+        audio = AudioSegment(samples.astype(np.int16).tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+        audio.export(str(filepath), format='mp3', bitrate=bitrate)
+        return
+
+    import soundfile
+
+    if audio_format == 'opus' and sample_rate not in OPUS_SAMPLE_RATES:
+        samples, sample_rate = _resample(samples, sample_rate, 48000), 48000
+    soundfile.write(str(filepath), samples, sample_rate, format='OGG', subtype=AUDIO_FORMATS[audio_format])
+
+
+def _resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    from scipy.signal import resample_poly
+
+    divisor = gcd(sample_rate, target_rate)
+    resampled = resample_poly(samples.astype(np.float32), target_rate // divisor, sample_rate // divisor)
+    return np.clip(resampled, -32768, 32767).astype(np.int16)
+
+
+@dataclass(frozen=True)
+class AugmentationConfig:
+    """Ranges that seeded variants draw their band conditions from."""
+    snr_db: tuple[float, float] = (3.0, 20.0)  # additive white noise (static)
+    fading_depth: tuple[float, float] = (0.0, 0.7)  # QSB envelope depth
+    fading_rate: tuple[float, float] = (0.2, 1.5)  # QSB envelope frequency, Hz
+    qrm_level: tuple[float, float] = (0.0, 0.4)  # interfering carrier amplitude relative to the signal
+    qrm_frequency: tuple[float, float] = (400.0, 1200.0)  # interfering carrier frequency, Hz
+    pitch_jitter: float = 0.03  # maximum relative pitch deviation
+
+    def key(self) -> str:
+        return hashlib.md5(repr(self).encode()).hexdigest()[:8]
+
+
+def augment_pcm(clean: np.ndarray, sample_rate: int, seeds: Sequence[int],
+                config: AugmentationConfig = AugmentationConfig()) -> np.ndarray:
+    """Render one noisy variant of a clean 16-bit clip per seed as a (len(seeds), samples) int16 batch.
+
+    Each variant depends only on its own seed, so a variant can be regenerated
+    on its own and comes out identical to the one rendered in a larger batch.
+    """
+    length = len(clean)
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+
+    def draw(bounds: tuple[float, float]) -> np.ndarray:
+        return np.array([rng.uniform(*bounds) for rng in rngs])[:, None]
+
+    pitch = 1 + draw((-config.pitch_jitter, config.pitch_jitter))
+    snr_db = draw(config.snr_db)
+    fading_depth = draw(config.fading_depth)
+    fading_rate = draw(config.fading_rate)
+    fading_phase = draw((0, 2 * np.pi))
+    qrm_level = draw(config.qrm_level)
+    qrm_frequency = draw(config.qrm_frequency)
+    qrm_phase = draw((0, 2 * np.pi))
+    noise = np.stack([rng.standard_normal(length, dtype=np.float32) for rng in rngs])
+
+    # Pitch jitter by reading the clean clip at a slightly different rate (linear interpolation)
+    signal = np.append(clean.astype(np.float32) / 32768, np.float32(0))
+    position = np.minimum(np.arange(length) * pitch, length - 1)
+    index = position.astype(np.int64)
+    fraction = (position - index).astype(np.float32)
+    batch = signal[index] * (1 - fraction) + signal[index + 1] * fraction
+
+    # Reference power over key-down samples only, so SNR does not depend on the amount of silence
+    key_down = np.abs(batch) > 1e-3
+    power = (batch ** 2).sum(axis=1, keepdims=True) / np.maximum(key_down.sum(axis=1, keepdims=True), 1)
+
+    t = np.arange(length, dtype=np.float32) / sample_rate
+    batch *= 1 - fading_depth * 0.5 * (1 + np.sin(2 * np.pi * fading_rate * t + fading_phase))
+    batch += qrm_level * np.sqrt(2 * power) * np.sin(2 * np.pi * qrm_frequency * t + qrm_phase)
+    batch += noise * np.sqrt(power / 10 ** (snr_db / 10))
+
+    peak = np.maximum(np.abs(batch).max(axis=1, keepdims=True), 1e-9)
+    batch *= np.minimum(1, 0.9 / peak)
+    return (batch * 32767).astype(np.int16)
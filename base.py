@@ -1,10 +1,62 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import ExitStack, contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
 from pathlib import Path
+from typing import Any, Callable, ContextManager, Hashable, Iterable, Iterator, Optional, Sequence, TypeVar
 
+import argparse
 import genanki
 import hashlib
+import os
+import random
+import re
+import tempfile
+import time
 from dataclasses import dataclass
 
+from apkg import reproducible_timestamp, write_package
+from assets import content_hashed_media, write_asset
+from budget import budget_violations, build_report
+from collection import update_collection
+from delta import Manifest, write_delta_package
+from metrics import METRICS_FORMATS, BuildMetrics
+from notes import NoteStore
+from profiling import StageProfiler
+from sharding import Shard, shard_deck
+from verify import rename_media_references, verify_package
+
+BIN_PATH = Path(__file__).parent / 'bin'
+CACHE_PATH = Path(__file__).parent / 'cache'
+
+T = TypeVar('T')
+_PROCESS_CACHE: dict[Hashable, Any] = {}
+
+
+def process_cache(key: Hashable, factory: Callable[[], T]) -> T:
+    """Return the value cached under key, calling factory only the first time in this process.
+
+    This module is imported once per process, so in watch mode the values
+    outlive the deck scripts that are re-run on every change. None is not
+    cached, so a failed download or lookup is tried again next time.
+    """
+    if key in _PROCESS_CACHE:
+        return _PROCESS_CACHE[key]
+    value = factory()
+    if value is not None:
+        _PROCESS_CACHE[key] = value
+    return value
+
+
+def source_digest(path: str | Path) -> str:
+    """Short hash of a source file, for process_cache keys of values its code produces.
+
+    Deck scripts are re-run on every watch mode rebuild, so keys that
+    include their own digest stop matching as soon as the script changes.
+    """
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:12]
+
 
 @dataclass
 class DeckMetadata:
@@ -26,6 +78,186 @@ class DeckMetadata:
         return True
 
 
+@dataclass
+class BuildOptions:
+    profile: bool = False
+    metrics: Optional[str] = None  # 'jsonl' or 'prometheus'
+    verify: bool = False
+    reproducible: bool = False
+    delta_from: Optional[str] = None  # Manifest or .apkg of the previous build
+    shard_notes: Optional[int] = None
+    shard_media_mb: Optional[float] = None
+    shard_packages: bool = False  # Separate package per shard instead of subdecks in one package
+    collection: Optional[str] = None  # Local collection.anki2 to update instead of writing a package
+    max_package_mb: Optional[float] = None
+    max_note_kb: Optional[float] = None  # Average package bytes per note
+    max_build_seconds: Optional[float] = None
+    hash_media: bool = True  # Rename media after their content when packaging
+    dedupe: bool = False  # Report near-duplicate notes in the built deck
+
+    @classmethod
+    def from_args(cls, argv: Optional[Sequence[str]] = None) -> 'BuildOptions':
+        parser = argparse.ArgumentParser(description="Build Anki deck packages into bin/")
+        parser.add_argument(
+            '--profile', action='store_true',
+            help="Profile each build stage and write .pstats files and a peak memory table to bin/profile/"
+        )
+        parser.add_argument(
+            '--metrics', choices=METRICS_FORMATS,
+            help="Write stage spans, counters and latency histograms to bin/metrics/ as JSON lines "
+                 "or a Prometheus textfile"
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Check each written package for missing or orphaned media, duplicate GUIDs and empty fields"
+        )
+        parser.add_argument(
+            '--reproducible', action='store_true',
+            help="Seed card ordering and fix timestamps and zip metadata so identical inputs give identical "
+                 "packages, stamped with SOURCE_DATE_EPOCH or else the last commit time"
+        )
+        parser.add_argument(
+            '--delta-from', metavar='PATH',
+            help="Also write an update package with only the notes and media changed since the build "
+                 "described by this .manifest.json or .apkg"
+        )
+        parser.add_argument(
+            '--shard-notes', type=int, metavar='N',
+            help="Split the deck into 'Deck::Part N' subdecks of at most N notes"
+        )
+        parser.add_argument(
+            '--shard-media-mb', type=float, metavar='MB',
+            help="Split the deck into 'Deck::Part N' subdecks with at most MB megabytes of media each"
+        )
+        parser.add_argument(
+            '--shard-packages', action='store_true',
+            help="Write each shard to its own <deck>.partN.apkg, concurrently, instead of one package"
+        )
+        parser.add_argument(
+            '--collection', metavar='PATH',
+            help="Upsert notes and media straight into this local collection.anki2 instead of writing a package "
+                 "(Anki must be closed)"
+        )
+        parser.add_argument(
+            '--max-package-mb', type=float, metavar='MB',
+            help="Fail the build when its packages add up to more than MB megabytes"
+        )
+        parser.add_argument(
+            '--max-note-kb', type=float, metavar='KB',
+            help="Fail the build when the packages average more than KB kilobytes per note"
+        )
+        parser.add_argument(
+            '--max-build-seconds', type=float, metavar='SECONDS',
+            help="Fail the build when it takes longer than SECONDS"
+        )
+        parser.add_argument(
+            '--keep-media-names', dest='hash_media', action='store_false',
+            help="Package media under the names the deck gave them instead of content-hashed names"
+        )
+        parser.add_argument(
+            '--dedupe', action='store_true',
+            help="Report near-duplicate notes in the built deck, like dedupe.py does for the question banks"
+        )
+        args = parser.parse_args(argv)
+        return cls(profile=args.profile, metrics=args.metrics, verify=args.verify, reproducible=args.reproducible,
+                   delta_from=args.delta_from, shard_notes=args.shard_notes, shard_media_mb=args.shard_media_mb,
+                   shard_packages=args.shard_packages, collection=args.collection,
+                   max_package_mb=args.max_package_mb, max_note_kb=args.max_note_kb,
+                   max_build_seconds=args.max_build_seconds, hash_media=args.hash_media,
+                   dedupe=args.dedupe)
+
+
+@dataclass
+class PipelineStage:
+    """One step of a Pipeline. The function returns the item for the next stage, or None to drop it."""
+    name: str
+    function: Callable[[Any], Any]
+    workers: int = 1
+
+
+class Pipeline:
+    """Runs items through stages that each have their own thread pool and concurrency limit.
+
+    An item moves on as soon as it leaves a stage, so stages overlap and the
+    total time approaches that of the slowest stage. At most `capacity`
+    items are in flight; when a stage or the consumer falls behind, the
+    source is not pulled any further. Results come out in input order.
+    Each call runs inside `worker(stage name)` when given, such as
+    AnkiDeck.worker, so profilers can follow the work onto pool threads.
+    """
+
+    def __init__(self, stages: Sequence[PipelineStage], capacity: Optional[int] = None,
+                 metrics: Optional[BuildMetrics] = None,
+                 worker: Optional[Callable[[str], ContextManager[None]]] = None):
+        self.stages = list(stages)
+        self.capacity = capacity or 2 * sum(stage.workers for stage in self.stages)
+        self.metrics = metrics
+        self.worker = worker
+
+    def _call(self, stage: PipelineStage, item: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            with self.worker(stage.name) if self.worker else nullcontext():
+                return stage.function(item)
+        finally:
+            if self.metrics:
+                self.metrics.observe(f'pipeline_{stage.name}_seconds', time.perf_counter() - start)
+
+    def _submit(self, executors: list[ThreadPoolExecutor], item: Any) -> Future:
+        result = Future()
+
+        def advance(index: int, value: Any) -> None:
+            if value is None or index == len(self.stages):
+                result.set_result(value)
+                return
+            try:
+                future = executors[index].submit(self._call, self.stages[index], value)
+            except RuntimeError:  # Shut down after another item failed
+                result.cancel()
+                return
+            future.add_done_callback(lambda done: finish(index, done))
+
+        def finish(index: int, done: Future) -> None:
+            if done.cancelled():
+                result.cancel()
+            elif done.exception() is not None:
+                result.set_exception(done.exception())
+            else:
+                advance(index + 1, done.result())
+
+        advance(0, item)
+        return result
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        executors = [
+            ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=f'pipeline-{stage.name}')
+            for stage in self.stages
+        ]
+        pending: deque[Future] = deque()
+        try:
+            for item in items:
+                pending.append(self._submit(executors, item))
+                while len(pending) >= self.capacity or (pending and pending[0].done()):
+                    value = pending.popleft().result()
+                    if value is not None:
+                        yield value
+            while pending:
+                value = pending.popleft().result()
+                if value is not None:
+                    yield value
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _staged(name: str, method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.stage(name):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class AnkiDeck(ABC):
     def __init__(self, metadata: DeckMetadata):
         self.metadata = metadata
@@ -33,6 +265,34 @@ class AnkiDeck(ABC):
         self._model_id = self._generate_id("model")
         self._deck_id = self._generate_id("deck")
         self.media_files: list[str] = []
+        self.metrics = BuildMetrics(self.metadata.title)
+        self.observers: list = [self.metrics]  # Objects with a stage(name) context manager
+        self._shared_assets: dict[tuple[str, str, str], Path] = {}
+        self.random = random.Random()  # Use for any shuffling so reproducible builds can seed it
+        self.note_seconds: list[float] = []  # Time until each note of the last create_deck was generated
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclasses call create_model themselves, so it is wrapped to report its own stage
+        if 'create_model' in cls.__dict__:
+            cls.create_model = _staged('create_model', cls.__dict__['create_model'])
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mark a build stage for whichever observers are attached."""
+        with ExitStack() as stack:
+            for observer in self.observers:
+                stack.enter_context(observer.stage(name))
+            yield
+
+    @contextmanager
+    def worker(self, name: str) -> Iterator[None]:
+        """Mark work done on a pool thread for the current stage, for observers that follow threads."""
+        with ExitStack() as stack:
+            for observer in self.observers:
+                if hasattr(observer, 'worker'):
+                    stack.enter_context(observer.worker(name))
+            yield
 
     def _generate_id(self, prefix: str) -> int:
         stable_input = f"{prefix}-{self.metadata.title}-{self.metadata.author}-{self.metadata.version}"
@@ -63,7 +323,11 @@ For support, bug reports, or feature requests, please visit:
 
     @abstractmethod
     def generate_cards(self) -> list[genanki.Note]:
-        """Generate and return a list of Anki notes"""
+        """Generate and return a list of Anki notes, or yield them so large decks never hold them all as objects"""
+        pass
+
+    def generate_media(self) -> None:
+        """Generate media files needed by the cards before they are generated"""
         pass
 
     def get_default_css(self) -> str:
@@ -98,17 +362,192 @@ For support, bug reports, or feature requests, please visit:
         }
         """
 
+    def shared_asset(self, content: str, suffix: str, name: Optional[str] = None) -> str:
+        """Add a minified, content-hashed `.css` or `.js` media file and return its filename.
+
+        Files are named after the deck unless a name is given, so identical
+        content always maps to the same file and is stored once.
+        """
+        key = (content, suffix, name or '')
+        path = self._shared_assets.get(key)
+        if path is None or not path.exists():
+            stem = name or re.sub(r'[^a-z0-9]+', '_', self.metadata.title.lower()).strip('_')
+            path = write_asset(content, suffix, stem, CACHE_PATH / 'assets')
+            self._shared_assets[key] = path
+        if str(path) not in self.media_files:
+            self.media_files.append(str(path))
+        return path.name
+
+    def shared_css(self, css: str, name: Optional[str] = None) -> str:
+        """Model CSS that imports the given CSS from a shared media file instead of inlining it"""
+        return f'@import url("{self.shared_asset(css, ".css", name)}");'
+
+    def shared_script(self, js: str, name: Optional[str] = None) -> str:
+        """Template markup that loads the given JavaScript from a shared media file"""
+        return f'<script src="{self.shared_asset(js, ".js", name)}"></script>'
+
     def create_deck(self) -> genanki.Deck:
-        deck = genanki.Deck(self._deck_id, self.metadata.title)
-        deck.description = self._format_description()
-        for note in self.generate_cards():
-            deck.add_note(note)
-        return deck
-
-    def save_deck(self, output_filename: str) -> None:
-        bin_path = Path(__file__).parent / 'bin'
-        bin_path.mkdir(exist_ok=True)
-        package = genanki.Package(self.create_deck())
-        if self.media_files:
-            package.media_files = self.media_files
-        package.write_to_file(str(bin_path / output_filename))
\ No newline at end of file
+        with self.stage('create_deck'):
+            deck = genanki.Deck(self._deck_id, self.metadata.title)
+            deck.description = self._format_description()
+            deck.notes = NoteStore()  # Notes become genanki.Note objects again only while being written
+            with self.stage('generate_media'):
+                self.generate_media()
+            with self.stage('generate_cards'):
+                self.note_seconds = []
+                start = time.perf_counter()
+                for note in self.generate_cards():
+                    now = time.perf_counter()
+                    self.note_seconds.append(now - start)
+                    self.metrics.observe('note_seconds', now - start)
+                    deck.add_note(note)
+                    start = time.perf_counter()
+            return deck
+
+    def _hash_media(self, deck: genanki.Deck, directory: Path) -> list[str]:
+        """Rename media after their content and rewrite the note fields that reference them.
+
+        A changed file gets a new name, so Anki and sync never keep a stale
+        copy, and files from other decks or versions cannot be overwritten.
+        The note store already holds each note's GUID, so notes without an
+        explicit one keep the GUID derived from their original fields.
+        self.media_files keeps the original paths so decks can still clean
+        up the files they generated.
+        """
+        hashed = content_hashed_media(self.media_files, directory)
+        names = {name: path.name for name, path in hashed.items()}
+        deck.notes.map_fields(lambda value: rename_media_references(value, names))
+        return list(dict.fromkeys(str(hashed.get(Path(file).name, file)) for file in self.media_files))
+
+    def _write_packages(self, deck: genanki.Deck, media_files: list[str], stem: str, output_filename: str,
+                        options: BuildOptions) -> list[Path]:
+        """Write the deck as one package, or shard it first when a shard bound is set"""
+        if not (options.shard_notes or options.shard_media_mb):
+            package = genanki.Package(deck)
+            package.media_files = media_files
+            write_package(package, BIN_PATH / output_filename, options.reproducible)
+            return [BIN_PATH / output_filename]
+
+        with self.stage('shard'):
+            shards = shard_deck(
+                deck, media_files, lambda number: self._generate_id(f"deck-part-{number}"),
+                options.shard_notes, options.shard_media_mb and int(options.shard_media_mb * 2 ** 20),
+            )
+        self.metrics.increment('shards_total', len(shards))
+        if not options.shard_packages:
+            package = genanki.Package([shard.deck for shard in shards])
+            package.media_files = media_files
+            write_package(package, BIN_PATH / output_filename, options.reproducible)
+            return [BIN_PATH / output_filename]
+
+        # Stage observers are not all thread-safe, so workers only record timings
+        def write_shard(number: int, shard: Shard) -> Path:
+            with self.metrics.timer('shard_write_seconds'):
+                package = genanki.Package(shard.deck)
+                package.media_files = shard.media_files
+                path = BIN_PATH / f'{stem}.part{number}.apkg'
+                write_package(package, path, options.reproducible)
+                return path
+
+        with self.stage('write_shards'):
+            with ThreadPoolExecutor(max_workers=min(len(shards), os.cpu_count() or 1)) as executor:
+                return list(executor.map(write_shard, range(1, len(shards) + 1), shards))
+
+    def save_deck(self, output_filename: str, options: Optional[BuildOptions] = None) -> None:
+        options = options or BuildOptions()
+        stem = Path(output_filename).stem
+        self.metrics.reset()  # Budgets and reports cover this build only, also when a deck is saved again
+        build_start = time.perf_counter()
+        profiler = StageProfiler() if options.profile else None
+        hashed_media = None
+        if profiler:
+            self.observers.append(profiler)
+        if options.metrics == 'jsonl':
+            self.metrics.open_stream(BIN_PATH / 'metrics' / f'{stem}.jsonl')
+
+        try:
+            with self.stage('save_deck'):
+                BIN_PATH.mkdir(exist_ok=True)
+                if options.reproducible:
+                    reproducible_timestamp()  # Fails before anything is built when there is no timestamp to use
+                    self.random.seed(self._deck_id)
+                deck = self.create_deck()
+                if options.dedupe:
+                    # Imported here because dedupe reads question banks through data_deck, which imports this module
+                    from dedupe import find_duplicate_notes
+
+                    with self.stage('dedupe'):
+                        clusters = find_duplicate_notes(deck, Path(output_filename))
+                    self.metrics.increment('duplicate_clusters_total', len(clusters))
+                    for cluster in clusters:
+                        print(cluster.format())
+                    print(f"{output_filename}: {len(clusters)} near-duplicate clusters")
+                media_files = self.media_files
+                if options.hash_media:
+                    with self.stage('hash_media'):
+                        CACHE_PATH.mkdir(exist_ok=True)
+                        hashed_media = tempfile.TemporaryDirectory(prefix=f'{stem}-media-', dir=CACHE_PATH)
+                        media_files = self._hash_media(deck, Path(hashed_media.name))
+                if options.collection:
+                    with self.stage('update_collection'):
+                        update = update_collection(deck, media_files, Path(options.collection))
+                    for change in ('added', 'updated', 'unchanged'):
+                        self.metrics.increment('collection_notes_total', getattr(update, f'{change}_notes'), change=change)
+                    print(f"{options.collection}: {update.format()}")
+                    package_paths = []
+                else:
+                    package_paths = self._write_packages(deck, media_files, stem, output_filename, options)
+                if options.verify:
+                    with self.stage('verify'):
+                        reports = [verify_package(path) for path in package_paths]
+                    failed = [report.format() for report in reports if not report.ok]
+                    if failed:
+                        raise ValueError("Package verification failed\n" + '\n'.join(failed))
+
+                with self.stage('write_manifest'):
+                    manifest = Manifest.from_deck(deck, media_files, self.metadata.version)
+                    manifest.write(BIN_PATH / f'{stem}.manifest.json')
+                if options.delta_from:
+                    with self.stage('write_delta'):
+                        delta = write_delta_package(
+                            deck, media_files, manifest, Manifest.load(options.delta_from),
+                            BIN_PATH / f'{stem}.delta.apkg', options.reproducible,
+                        )
+                    self.metrics.increment('delta_notes_total', delta.notes)
+                    self.metrics.increment('delta_media_files_total', delta.media)
+                    print(f"{stem}.delta.apkg: {delta.notes} changed notes, {delta.media} changed media files"
+                          + (f", {delta.removed_notes} removed notes need deleting by hand" if delta.removed_notes else ''))
+
+                with self.stage('report'):
+                    package_bytes = sum(os.path.getsize(path) for path in package_paths)
+                    report = build_report(
+                        deck, media_files,
+                        package_bytes or sum(os.path.getsize(file) for file in set(media_files)),
+                        time.perf_counter() - build_start,
+                        self.metrics.stage_seconds['create_deck'],
+                        self.note_seconds,
+                    )
+                    report.write(BIN_PATH / 'reports', stem)
+                violations = budget_violations(
+                    report, options.max_package_mb and options.max_package_mb * 2 ** 20,
+                    options.max_note_kb and options.max_note_kb * 1024, options.max_build_seconds,
+                )
+                if violations:
+                    raise ValueError(f"Build budget exceeded for {stem}, see bin/reports/{stem}.txt\n"
+                                     + '\n'.join(violations))
+
+            self.metrics.increment('notes_total', len(deck.notes))
+            self.metrics.increment('media_files_total', len(media_files))
+            self.metrics.increment('media_bytes_total', sum(os.path.getsize(file) for file in media_files))
+            self.metrics.increment('package_bytes_total', sum(os.path.getsize(path) for path in package_paths))
+            if options.metrics == 'prometheus':
+                self.metrics.write_prometheus(BIN_PATH / 'metrics' / f'{stem}.prom')
+        finally:
+            if hashed_media:
+                hashed_media.cleanup()
+            if profiler:
+                self.observers.remove(profiler)
+            self.metrics.close()
+
+        if profiler:
+            profiler.write_report(BIN_PATH / 'profile', stem)
\ No newline at end of file
@@ -0,0 +1,147 @@
+import html
+import json
+import os
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+
+import genanki
+
+from verify import media_references
+
+AUDIO_SUFFIXES = frozenset({'.mp3', '.ogg', '.opus', '.wav', '.flac'})
+TOP_COUNT = 10  # Entries in each largest/slowest list
+_HTML_TAG = re.compile(r'<[^>]*>')
+
+
+@dataclass
+class Asset:
+    name: str
+    bytes: int
+    duration: Optional[float] = None  # seconds, for audio
+
+
+@dataclass
+class BuildReport:
+    """Where a deck's package bytes and build time went."""
+    deck: str
+    notes: int
+    package_bytes: int
+    build_seconds: float
+    generation_seconds: float  # Media and card generation, i.e. create_deck
+    media_types: dict[str, list[int]] = field(default_factory=dict)  # suffix -> [files, bytes]
+    largest_assets: list[Asset] = field(default_factory=list)
+    longest_audio: list[Asset] = field(default_factory=list)
+    largest_notes: list[tuple[str, int]] = field(default_factory=list)  # (label, text and media bytes)
+    slowest_notes: list[tuple[str, float]] = field(default_factory=list)  # (label, seconds until generated)
+
+    @property
+    def bytes_per_note(self) -> float:
+        return self.package_bytes / self.notes if self.notes else 0.0
+
+    @property
+    def seconds_per_note(self) -> float:
+        return self.generation_seconds / self.notes if self.notes else 0.0
+
+    def format(self) -> str:
+        lines = [
+            f"{self.deck}: {self.notes} notes, {self.package_bytes / 2 ** 20:.2f} MiB packaged, "
+            f"{self.bytes_per_note / 1024:.1f} KiB per note",
+            f"Build {self.build_seconds:.1f}s, generation {self.seconds_per_note * 1000:.1f} ms per note",
+            "Media by type:",
+        ]
+        lines += [f"  {suffix or '(none)'}: {files} files, {size / 1024:.1f} KiB"
+                  for suffix, (files, size) in sorted(self.media_types.items(), key=lambda item: -item[1][1])]
+        lines.append("Largest assets:")
+        lines += [f"  {asset.name}: {asset.bytes / 1024:.1f} KiB" for asset in self.largest_assets]
+        if self.longest_audio:
+            lines.append("Longest audio:")
+            lines += [f"  {asset.name}: {asset.duration:.2f}s, {asset.bytes / 1024:.1f} KiB"
+                      for asset in self.longest_audio]
+        lines.append("Largest notes:")
+        lines += [f"  {label}: {size / 1024:.1f} KiB" for label, size in self.largest_notes]
+        lines.append("Slowest notes:")
+        lines += [f"  {label}: {seconds * 1000:.1f} ms" for label, seconds in self.slowest_notes]
+        return '\n'.join(lines)
+
+    def write(self, directory: Path, stem: str) -> None:
+        """Write the report as <stem>.txt, with the same data in <stem>.json for tracking over time."""
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f'{stem}.txt').write_text(self.format() + '\n')
+        (directory / f'{stem}.json').write_text(json.dumps(
+            {**asdict(self), 'bytes_per_note': self.bytes_per_note, 'seconds_per_note': self.seconds_per_note},
+            indent=2,
+        ))
+
+
+def _audio_duration(path: str) -> Optional[float]:
+    try:
+        import soundfile
+
+        return soundfile.info(path).duration
+    except Exception:  # Formats libsndfile cannot read are simply reported without a duration
+        return None
+
+
+def _note_label(note: genanki.Note) -> str:
+    text = ' '.join(html.unescape(_HTML_TAG.sub(' ', note.fields[0])).split())
+    return text[:50] or next(iter(sorted(media_references(note.fields[0]))), note.guid)
+
+
+def build_report(deck: genanki.Deck, media_files: Sequence[str], package_bytes: int, build_seconds: float,
+                 generation_seconds: float, note_seconds: Sequence[float]) -> BuildReport:
+    """Break a build down by media type, asset and note.
+
+    Media referenced by several notes is split evenly between them in the
+    per-note sizes; media only referenced by the models, such as shared
+    stylesheets, counts towards the types and assets but no note. Note
+    timings are the time until each note was generated, so decks that build
+    every note before returning any put all of it on the first.
+    """
+    report = BuildReport(deck.name, len(deck.notes), package_bytes, build_seconds, generation_seconds)
+    paths = {Path(file).name: file for file in media_files}
+    sizes = {name: os.path.getsize(file) for name, file in paths.items()}
+
+    media_types: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for name, size in sizes.items():
+        media_types[Path(name).suffix.lower()][0] += 1
+        media_types[Path(name).suffix.lower()][1] += size
+    report.media_types = dict(media_types)
+
+    largest = sorted(sizes.items(), key=lambda item: -item[1])[:TOP_COUNT]
+    report.largest_assets = [Asset(name, size) for name, size in largest]
+    audio = [Asset(name, sizes[name], _audio_duration(file)) for name, file in paths.items()
+             if Path(name).suffix.lower() in AUDIO_SUFFIXES]
+    report.longest_audio = sorted((asset for asset in audio if asset.duration is not None),
+                                  key=lambda asset: -asset.duration)[:TOP_COUNT]
+
+    note_media = [media_references('\x1f'.join(note.fields)) & sizes.keys() for note in deck.notes]
+    references: dict[str, int] = defaultdict(int)
+    for names in note_media:
+        for name in names:
+            references[name] += 1
+    note_bytes = [
+        sum(len(value.encode()) for value in note.fields) + sum(sizes[name] // references[name] for name in names)
+        for note, names in zip(deck.notes, note_media)
+    ]
+    by_size = sorted(range(len(deck.notes)), key=lambda index: -note_bytes[index])[:TOP_COUNT]
+    report.largest_notes = [(_note_label(deck.notes[index]), note_bytes[index]) for index in by_size]
+    by_time = sorted(range(len(note_seconds)), key=lambda index: -note_seconds[index])[:TOP_COUNT]
+    report.slowest_notes = [(_note_label(deck.notes[index]), note_seconds[index]) for index in by_time]
+    return report
+
+
+def budget_violations(report: BuildReport, max_package_bytes: Optional[float] = None,
+                      max_bytes_per_note: Optional[float] = None,
+                      max_build_seconds: Optional[float] = None) -> list[str]:
+    violations = []
+    if max_package_bytes is not None and report.package_bytes > max_package_bytes:
+        violations.append(f"package size {report.package_bytes / 2 ** 20:.2f} MiB exceeds "
+                          f"{max_package_bytes / 2 ** 20:.2f} MiB")
+    if max_bytes_per_note is not None and report.bytes_per_note > max_bytes_per_note:
+        violations.append(f"{report.bytes_per_note / 1024:.1f} KiB per note exceeds {max_bytes_per_note / 1024:.1f} KiB")
+    if max_build_seconds is not None and report.build_seconds > max_build_seconds:
+        violations.append(f"build time {report.build_seconds:.1f}s exceeds {max_build_seconds:.1f}s")
+    return violations
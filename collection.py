@@ -0,0 +1,202 @@
+import hashlib
+import html
+import itertools
+import json
+import re
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import genanki
+
+from delta import file_digest
+
+_HTML_TAG = re.compile(r'<[^>]*>')
+
+
+@dataclass
+class CollectionUpdate:
+    added_notes: int = 0
+    updated_notes: int = 0
+    unchanged_notes: int = 0
+    copied_media: int = 0
+
+    def format(self) -> str:
+        return (f"{self.added_notes} notes added, {self.updated_notes} updated, {self.unchanged_notes} unchanged, "
+                f"{self.copied_media} media files copied")
+
+
+def _sort_field(value: str) -> tuple[str, int]:
+    """The sort field as Anki stores it, without HTML, and its duplicate check checksum"""
+    text = html.unescape(_HTML_TAG.sub('', value))
+    return text, int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+def _unicase(a: str, b: str) -> int:
+    a, b = a.casefold(), b.casefold()
+    return (a > b) - (a < b)
+
+
+class _Schema:
+    """Notetype and deck lookups for the legacy (JSON in `col`) and modern (separate tables) schemas."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.modern = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notetypes'"
+        ).fetchone() is not None
+
+    def ensure_model(self, model: genanki.Model, deck_id: int, timestamp: int) -> None:
+        if self.modern:
+            (field_count,) = self.connection.execute(
+                'SELECT count(*) FROM fields WHERE ntid = ?', (model.model_id,)
+            ).fetchone()
+            if field_count == 0:
+                raise ValueError(
+                    f"Note type {model.name!r} ({model.model_id}) is not in the collection. Import the deck's "
+                    f".apkg once, since new note types cannot be created in this collection format directly"
+                )
+            if field_count != len(model.fields):
+                raise ValueError(f"Note type {model.name!r} has {field_count} fields in the collection, "
+                                 f"expected {len(model.fields)}")
+            return
+
+        (models_json,) = self.connection.execute('SELECT models FROM col').fetchone()
+        models = json.loads(models_json)
+        models[str(model.model_id)] = model.to_json(timestamp, deck_id)
+        self.connection.execute('UPDATE col SET models = ?', (json.dumps(models),))
+
+    def ensure_deck(self, deck: genanki.Deck) -> int:
+        """Return the collection's ID for the deck; Anki assigns a new one when it imports a package."""
+        if self.modern:
+            row = self.connection.execute(
+                'SELECT id FROM decks WHERE id = ? OR name = ? ORDER BY id = ? DESC',
+                (deck.deck_id, deck.name.replace('::', '\x1f'), deck.deck_id)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Deck {deck.name!r} is not in the collection. Import the deck's .apkg once, "
+                                 f"since decks cannot be created in this collection format directly")
+            return row[0]
+
+        (decks_json,) = self.connection.execute('SELECT decks FROM col').fetchone()
+        decks = json.loads(decks_json)
+        if str(deck.deck_id) in decks:
+            return deck.deck_id
+        for deck_id, existing in decks.items():
+            if existing['name'] == deck.name:
+                return int(deck_id)
+        decks[str(deck.deck_id)] = deck.to_json()
+        self.connection.execute('UPDATE col SET decks = ?', (json.dumps(decks),))
+        return deck.deck_id
+
+    def register_tags(self, tags: set[str]) -> None:
+        if self.modern:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO tags (tag, usn, collapsed) VALUES (?, -1, 0)', ((tag,) for tag in tags)
+            )
+            return
+
+        (tags_json,) = self.connection.execute('SELECT tags FROM col').fetchone()
+        registered = json.loads(tags_json)
+        registered.update({tag: -1 for tag in tags if tag not in registered})
+        self.connection.execute('UPDATE col SET tags = ?', (json.dumps(registered),))
+
+
+def update_collection(deck: genanki.Deck, media_files: Sequence[str], collection_path: Path,
+                      media_path: Optional[Path] = None) -> CollectionUpdate:
+    """Upsert a deck's notes by GUID straight into a local collection and copy changed media.
+
+    Existing notes keep their IDs, cards and review history; only fields and
+    tags that differ are written, and missing cards are added for new
+    templates. Anki must be closed while this runs. Collections in the
+    pre-2.1.28 schema get note types and decks added or updated as needed;
+    newer ones must already contain them, e.g. from importing the .apkg
+    once, and template or CSS changes still need a package import.
+    """
+    collection_path = Path(collection_path)
+    if not collection_path.exists():
+        raise ValueError(f"Collection not found: {collection_path}")
+    media_path = media_path or collection_path.with_name('collection.media')
+    update = CollectionUpdate()
+    timestamp = int(time.time())
+
+    connection = sqlite3.connect(collection_path)
+    connection.create_collation('unicase', _unicase)  # Used by the modern schema's indexes
+    try:
+        with connection:
+            schema = _Schema(connection)
+            deck_id = schema.ensure_deck(deck)
+            for model in {note.model.model_id: note.model for note in deck.notes}.values():
+                schema.ensure_model(model, deck_id, timestamp)
+
+            existing = {
+                guid: (note_id, model_id, fields, tags)
+                for note_id, guid, model_id, fields, tags in connection.execute(
+                    'SELECT id, guid, mid, flds, tags FROM notes'
+                )
+            }
+            existing_cards = set(connection.execute('SELECT nid, ord FROM cards'))
+            max_note_id, max_card_id, max_due = connection.execute(
+                'SELECT (SELECT coalesce(max(id), 0) FROM notes), (SELECT coalesce(max(id), 0) FROM cards), '
+                '(SELECT coalesce(max(due), 0) FROM cards WHERE type = 0)'
+            ).fetchone()
+            note_ids = itertools.count(max(max_note_id + 1, timestamp * 1000))
+            card_ids = itertools.count(max(max_card_id + 1, timestamp * 1000))
+            dues = itertools.count(max_due + 1)
+            tags_seen: set[str] = set()
+
+            for note in deck.notes:
+                fields = '\x1f'.join(note.fields)
+                tags = note._format_tags()
+                tags_seen.update(note.tags)
+                sort_text, checksum = _sort_field(note.sort_field)
+                guid = str(note.guid)  # Collections store GUIDs as text, some decks use integers
+                row = existing.get(guid)
+                if row is None:
+                    note_id = next(note_ids)
+                    connection.execute(
+                        "INSERT INTO notes VALUES (?, ?, ?, ?, -1, ?, ?, ?, ?, 0, '')",
+                        (note_id, guid, note.model.model_id, timestamp, tags, fields, sort_text, checksum)
+                    )
+                    update.added_notes += 1
+                else:
+                    note_id, model_id, old_fields, old_tags = row
+                    if model_id != note.model.model_id:
+                        raise ValueError(f"Note {guid} uses note type {model_id} in the collection, "
+                                         f"not {note.model.model_id}")
+                    if old_fields == fields and old_tags.split() == list(note.tags):
+                        update.unchanged_notes += 1
+                    else:
+                        connection.execute(
+                            'UPDATE notes SET flds = ?, sfld = ?, csum = ?, tags = ?, mod = ?, usn = -1 WHERE id = ?',
+                            (fields, sort_text, checksum, tags, timestamp, note_id)
+                        )
+                        update.updated_notes += 1
+
+                due = None
+                for card in note.cards:
+                    if (note_id, card.ord) not in existing_cards:
+                        due = next(dues) if due is None else due
+                        connection.execute(
+                            "INSERT INTO cards VALUES (?, ?, ?, ?, ?, -1, 0, ?, ?, 0, 0, 0, 0, 0, 0, 0, 0, '')",
+                            (next(card_ids), note_id, deck_id, card.ord, timestamp,
+                             -1 if card.suspend else 0, due)
+                        )
+
+            schema.register_tags(tags_seen)
+            connection.execute('UPDATE col SET mod = ?', (timestamp * 1000,))
+    finally:
+        connection.close()
+
+    media_path.mkdir(parents=True, exist_ok=True)
+    for file in dict.fromkeys(media_files):
+        target = media_path / Path(file).name
+        if (target.exists() and target.stat().st_size == Path(file).stat().st_size
+                and file_digest(target) == file_digest(file)):
+            continue
+        shutil.copyfile(file, target)
+        update.copied_media += 1
+    return update
@@ -0,0 +1,217 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import genanki
+import yaml
+
+from base import AnkiDeck, DeckMetadata
+
+DATA_PATH = Path(__file__).parent / 'data'
+RESERVED_KEYS = frozenset({'guid', 'tags'})
+PARALLEL_THRESHOLD = 4 * 2 ** 20  # Total bytes below which banks are parsed in-process
+CHUNK_BYTES = 2 ** 20
+HIGHLIGHT_BATCH = 1024  # Records whose code fields are highlighted together
+
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+Record = tuple[list[str], Optional[str], list[str]]  # field values, guid, tags
+
+
+def _header_fields(header, path: Path) -> list[str]:
+    fields = header.get('fields') if isinstance(header, dict) else None
+    if not isinstance(fields, list) or not fields:
+        raise ValueError(f"{path}: expected a 'fields' list naming the model fields the bank uses")
+    return fields
+
+
+def _declared_fields(header, path: Path, model_fields: Sequence[str]) -> frozenset:
+    """Validate a bank's `fields` header against the model and return the keys records may use."""
+    fields = _header_fields(header, path)
+    unknown = [name for name in fields if name not in model_fields]
+    if unknown:
+        raise ValueError(f"{path}: fields {unknown} are not in the model, expected some of {list(model_fields)}")
+    if model_fields[0] not in fields:
+        raise ValueError(f"{path}: the sort field '{model_fields[0]}' must be declared")
+    return frozenset(fields) | RESERVED_KEYS
+
+
+def _to_record(entry, allowed: frozenset, model_fields: Sequence[str], where: str) -> Record:
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where}: expected a mapping of field names to values")
+    extra = entry.keys() - allowed
+    if extra:
+        raise ValueError(f"{where}: undeclared keys {sorted(extra)}")
+    values = ['' if entry.get(name) is None else str(entry[name]) for name in model_fields]
+    if not values[0]:
+        raise ValueError(f"{where}: '{model_fields[0]}' is required")
+
+    tags = entry.get('tags') or []
+    if isinstance(tags, str):
+        tags = tags.split()
+    guid = entry.get('guid')
+    return values, None if guid is None else str(guid), [str(tag) for tag in tags]
+
+
+def _load_yaml(path: Path):
+    with open(path, encoding='utf-8') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+def _parse_yaml(path: Path, model_fields: Sequence[str], bank=None) -> list[Record]:
+    if bank is None:
+        bank = _load_yaml(path)
+    allowed = _declared_fields(bank, path, model_fields)
+    cards = bank.get('cards')
+    if not isinstance(cards, list):
+        raise ValueError(f"{path}: expected a 'cards' list")
+    return [_to_record(entry, allowed, model_fields, f"{path} card {index + 1}") for index, entry in enumerate(cards)]
+
+
+def _parse_jsonl(path: Path, start: int, end: int, allowed: frozenset, model_fields: Sequence[str]) -> list[Record]:
+    """Parse the records between two line-aligned byte offsets of a JSON lines bank."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    records = []
+    offset = start
+    for line in data.splitlines(keepends=True):
+        if line.strip():
+            where = f"{path} byte {offset}"
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{where}: {e}") from None
+            records.append(_to_record(entry, allowed, model_fields, where))
+        offset += len(line)
+    return records
+
+
+def _jsonl_chunks(path: Path, model_fields: Sequence[str]) -> list[tuple]:
+    """Validate the header line of a JSON lines bank and split the rest into line-aligned byte ranges."""
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: the first line must be a JSON header, {e}") from None
+        allowed = _declared_fields(header, path, model_fields)
+
+        boundaries = [f.tell()]
+        while boundaries[-1] + CHUNK_BYTES < size:
+            f.seek(boundaries[-1] + CHUNK_BYTES)
+            f.readline()
+            boundaries.append(f.tell())
+    boundaries.append(size)
+    return [(path, start, end, allowed, model_fields) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def _parse_task(task: tuple) -> list[Record]:
+    if len(task) == 2:
+        return _parse_yaml(*task)
+    return _parse_jsonl(*task)
+
+
+def read_bank(path: str | Path) -> tuple[list[str], list[Record]]:
+    """Read a bank on its own, without a model, returning the fields its header declares and its records."""
+    path = Path(path)
+    if path.suffix in ('.yaml', '.yml'):
+        bank = _load_yaml(path)
+        fields = _header_fields(bank, path)
+        return fields, _parse_yaml(path, fields, bank)
+    if path.suffix == '.jsonl':
+        with open(path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: the first line must be a JSON header, {e}") from None
+        fields = _header_fields(header, path)
+        return fields, [record for task in _jsonl_chunks(path, fields) for record in _parse_jsonl(*task)]
+    raise ValueError(f"Unsupported question bank format: {path}. Expected .yaml, .yml or .jsonl")
+
+
+class DataDeck(AnkiDeck):
+    """Deck whose notes come from YAML or JSON lines question banks.
+
+    A YAML bank has a top-level `fields` list and a `cards` list of mappings;
+    a JSON lines bank has a `{"fields": [...]}` header line followed by one
+    record per line. Records are keyed by model field name, with optional
+    `guid` and `tags` keys. Without a guid, notes get genanki's default guid
+    from their field values, so editing such a card makes Anki import it as
+    a new note beside the old one; give every card a guid to edit it in
+    place. Subclasses only provide create_model().
+
+    Fields named in HIGHLIGHT_FIELDS hold source code and are converted to
+    syntax highlighted HTML at build time; the model's CSS should include
+    highlight.highlight_css().
+    """
+    HIGHLIGHT_FIELDS: dict[str, str] = {}  # Field name -> Pygments language name
+
+    def __init__(self, metadata: DeckMetadata, sources: Sequence[str | Path], workers: Optional[int] = None):
+        super().__init__(metadata)
+        self.sources = [Path(source) for source in sources]
+        self.workers = workers
+
+    def _parse_tasks(self, model_fields: Sequence[str]) -> list[tuple]:
+        tasks = []
+        for path in self.sources:
+            if path.suffix in ('.yaml', '.yml'):
+                tasks.append((path, model_fields))
+            elif path.suffix == '.jsonl':
+                tasks.extend(_jsonl_chunks(path, model_fields))
+            else:
+                raise ValueError(f"Unsupported question bank format: {path}. Expected .yaml, .yml or .jsonl")
+        return tasks
+
+    def iter_records(self, model_fields: Sequence[str]) -> Iterator[Record]:
+        """Yield records in source order, parsing in worker processes when the banks are large."""
+        tasks = self._parse_tasks(model_fields)
+        total_bytes = sum(path.stat().st_size for path in self.sources)
+        if len(tasks) < 2 or total_bytes < PARALLEL_THRESHOLD or self.workers == 1:
+            for task in tasks:
+                yield from _parse_task(task)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers or os.cpu_count()) as executor:
+            for records in executor.map(_parse_task, tasks):
+                yield from records
+
+    def _highlight_records(self, records: Iterator[Record], model_fields: Sequence[str]) -> Iterator[Record]:
+        unknown = [name for name in self.HIGHLIGHT_FIELDS if name not in model_fields]
+        if unknown:
+            raise ValueError(f"Highlighted fields {unknown} are not in the model {list(model_fields)}")
+        if not self.HIGHLIGHT_FIELDS:
+            yield from records
+            return
+
+        from highlight import highlight_many
+
+        while batch := list(islice(records, HIGHLIGHT_BATCH)):
+            # Default GUIDs come from the source text, so changing the highlighter does not duplicate notes
+            batch = [(values, genanki.guid_for(*values) if guid is None else guid, tags) for values, guid, tags in batch]
+            with self.stage('highlight'):
+                for name, language in self.HIGHLIGHT_FIELDS.items():
+                    index = model_fields.index(name)
+                    html = highlight_many([values[index] for values, _, _ in batch], language, workers=self.workers)
+                    for (values, _, _), value in zip(batch, html):
+                        values[index] = value
+            yield from batch
+
+    def generate_cards(self) -> Iterator[genanki.Note]:
+        model = self.create_model()
+        model_fields = [field['name'] for field in model.fields]
+        if RESERVED_KEYS & set(model_fields):
+            raise ValueError(f"Model fields must not use the reserved names {sorted(RESERVED_KEYS)}")
+
+        count = 0
+        for values, guid, tags in self._highlight_records(self.iter_records(model_fields), model_fields):
+            count += 1
+            if guid is None:
+                yield genanki.Note(model=model, fields=values, tags=tags)
+            else:
+                yield genanki.Note(model=model, fields=values, tags=tags, guid=guid)
+        self.metrics.increment('data_records_total', count)
@@ -0,0 +1,193 @@
+import argparse
+import html
+import re
+import sys
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Sequence
+
+import genanki
+import numpy as np
+
+from data_deck import DATA_PATH, read_bank
+
+TOKEN = re.compile(r'\w+')
+HTML_TAG = re.compile(r'<[^>]*>')
+SHINGLE_SIZE = 3  # tokens
+NUM_PERM = 128
+BANDS = 32  # of NUM_PERM // BANDS rows; pairs from about 0.4 similarity on become candidates
+THRESHOLD = 0.5  # Estimated Jaccard similarity of the shingle sets
+BATCH_SHINGLES = 2 ** 18  # Shingle hashes permuted at once, bounding memory to BATCH_SHINGLES * NUM_PERM * 8 bytes
+TEXT_FIELDS = ('Question', 'Answer')
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+@dataclass
+class Card:
+    source: Path
+    number: int  # 1-based position in its bank
+    label: str
+
+    def format(self) -> str:
+        return f"{self.source.name} card {self.number}: {self.label}"
+
+
+@dataclass
+class DuplicateCluster:
+    cards: list[Card] = field(default_factory=list)
+    similarity: float = 0.0  # Lowest estimated similarity that joined the cluster
+
+    @property
+    def across_decks(self) -> bool:
+        return len({card.source for card in self.cards}) > 1
+
+    def format(self) -> str:
+        scope = 'across decks' if self.across_decks else 'within a deck'
+        return '\n'.join([f"{len(self.cards)} cards {scope}, similarity >= {self.similarity:.2f}",
+                          *(f"  {card.format()}" for card in self.cards)])
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    """Overlapping runs of `size` lowercase word tokens, ignoring HTML tags."""
+    tokens = TOKEN.findall(html.unescape(HTML_TAG.sub(' ', text)).lower())
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash_signatures(shingle_sets: Sequence[set[str]], num_perm: int = NUM_PERM, seed: int = 1) -> np.ndarray:
+    """One row of num_perm MinHash values per non-empty shingle set.
+
+    Shingles are hashed with CRC32 and permuted as (a * x + b) mod p, like
+    the usual universal hashing scheme; all sets are processed as one
+    concatenated array in bounded batches, so the cost is linear in the
+    total number of shingles.
+    """
+    generator = np.random.default_rng(seed)
+    a = generator.integers(1, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)[:, None]
+    b = generator.integers(0, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)[:, None]
+
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint32)
+    start = 0
+    while start < len(shingle_sets):
+        end, total = start, 0
+        while end < len(shingle_sets) and (end == start or total + len(shingle_sets[end]) <= BATCH_SHINGLES):
+            total += len(shingle_sets[end])
+            end += 1
+        batch = shingle_sets[start:end]
+        hashes = np.fromiter((zlib.crc32(s.encode()) for shingles_ in batch for s in shingles_),
+                             dtype=np.uint64, count=total)
+        offsets = np.cumsum([0] + [len(shingles_) for shingles_ in batch[:-1]])
+        with np.errstate(over='ignore'):  # The products wrap around, as in other MinHash implementations
+            permuted = ((a * hashes + b) % MERSENNE_PRIME) & MAX_HASH
+        signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+    return signatures
+
+
+def near_duplicates(shingle_sets: Sequence[set[str]], threshold: float = THRESHOLD, num_perm: int = NUM_PERM,
+                    bands: int = BANDS) -> list[tuple[list[int], float]]:
+    """Group near-duplicate shingle sets, returning (indices, lowest similarity) per group of two or more.
+
+    Signatures are split into bands and hashed into buckets; sets sharing a
+    bucket in any band are candidates, and a candidate joins the bucket's
+    first member when their estimated similarity reaches the threshold.
+    Comparing against one member per bucket keeps the work linear even when
+    many cards share a bucket. Empty sets are never grouped.
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+    indices = [index for index, shingles_ in enumerate(shingle_sets) if shingles_]
+    signatures = minhash_signatures([shingle_sets[index] for index in indices], num_perm)
+    rows = num_perm // bands
+
+    parent = list(range(len(indices)))
+    lowest: dict[int, float] = {}
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        for i, key in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets[key.tobytes()].append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                root_first, root_other = find(first), find(other)
+                if root_first == root_other:
+                    continue
+                similarity = float(np.mean(signatures[first] == signatures[other]))
+                if similarity >= threshold:
+                    parent[root_other] = root_first
+                    lowest[root_first] = min(similarity, lowest.get(root_first, 1.0), lowest.get(root_other, 1.0))
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(indices)):
+        groups[find(i)].append(indices[i])
+    return [(members, lowest.get(root, 1.0)) for root, members in groups.items() if len(members) > 1]
+
+
+def _label(text: str) -> str:
+    return (html.unescape(HTML_TAG.sub(' ', text)).strip().splitlines() or [''])[0][:70]
+
+
+def _clusters(cards: Sequence[Card], shingle_sets: Sequence[set[str]], threshold: float) -> list[DuplicateCluster]:
+    clusters = [
+        DuplicateCluster([cards[index] for index in members], similarity)
+        for members, similarity in near_duplicates(shingle_sets, threshold)
+    ]
+    return sorted(clusters, key=lambda cluster: (-len(cluster.cards), -cluster.similarity))
+
+
+def find_duplicate_cards(sources: Sequence[Path], text_fields: Sequence[str] = TEXT_FIELDS,
+                         threshold: float = THRESHOLD) -> list[DuplicateCluster]:
+    """Near-duplicate clusters of cards within and across question banks, largest first."""
+    cards: list[Card] = []
+    shingle_sets: list[set[str]] = []
+    for source in sources:
+        fields, records = read_bank(source)
+        positions = [fields.index(name) for name in text_fields if name in fields] or [0]
+        for number, (values, _, _) in enumerate(records, start=1):
+            cards.append(Card(source, number, _label(values[0])))
+            shingle_sets.append(shingles(' '.join(values[position] for position in positions)))
+    return _clusters(cards, shingle_sets, threshold)
+
+
+def find_duplicate_notes(deck: genanki.Deck, source: Path, text_fields: Sequence[str] = TEXT_FIELDS,
+                         threshold: float = THRESHOLD) -> list[DuplicateCluster]:
+    """Near-duplicate clusters among a built deck's notes, labelled as cards of `source`."""
+    cards: list[Card] = []
+    shingle_sets: list[set[str]] = []
+    positions: dict[int, list[int]] = {}
+    for number, note in enumerate(deck.notes, start=1):
+        if note.model.model_id not in positions:
+            names = [field['name'] for field in note.model.fields]
+            positions[note.model.model_id] = [names.index(name) for name in text_fields if name in names] or [0]
+        cards.append(Card(source, number, _label(note.fields[0])))
+        shingle_sets.append(shingles(' '.join(note.fields[position] for position in positions[note.model.model_id])))
+    return _clusters(cards, shingle_sets, threshold)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report near-duplicate cards within and across question banks")
+    parser.add_argument('sources', nargs='*', type=Path, help="Banks to compare (default: every bank in data/)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Estimated Jaccard similarity of word shingles at which cards are reported")
+    parser.add_argument('--fields', nargs='+', default=list(TEXT_FIELDS), help="Fields whose text is compared")
+    parser.add_argument('--strict', action='store_true', help="Exit with an error when any clusters are found")
+    args = parser.parse_args()
+
+    sources = args.sources or sorted(path for path in DATA_PATH.iterdir() if path.suffix in ('.yaml', '.yml', '.jsonl'))
+    duplicate_clusters = find_duplicate_cards(sources, args.fields, args.threshold)
+    for duplicate_cluster in duplicate_clusters:
+        print(duplicate_cluster.format())
+    print(f"{len(duplicate_clusters)} near-duplicate clusters in {len(sources)} banks")
+    sys.exit(1 if args.strict and duplicate_clusters else 0)
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import genanki
+
+from apkg import write_package
+from verify import COLLECTION_NAMES, media_references
+
+
+def note_digest(model_id: int, fields: Sequence[str], tags: Iterable[str]) -> str:
+    return hashlib.sha256('\x1f'.join([str(model_id), *fields, ' '.join(sorted(tags))]).encode()).hexdigest()
+
+
+def model_digest(css: str, templates: Sequence[tuple[str, str]], field_names: Sequence[str]) -> str:
+    return hashlib.sha256(json.dumps([css, list(map(list, templates)), list(field_names)]).encode()).hexdigest()
+
+
+def file_digest(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class Manifest:
+    """Content digests of one build: notes by GUID, models by ID and media by filename."""
+    version: str = ''
+    notes: dict[str, str] = field(default_factory=dict)
+    models: dict[str, str] = field(default_factory=dict)
+    media: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_deck(cls, deck: genanki.Deck, media_files: Sequence[str], version: str) -> 'Manifest':
+        manifest = cls(version)
+        for note in deck.notes:
+            model = note.model
+            manifest.notes[str(note.guid)] = note_digest(model.model_id, note.fields, note.tags)
+            if str(model.model_id) not in manifest.models:
+                manifest.models[str(model.model_id)] = model_digest(
+                    model.css, [(t['qfmt'], t['afmt']) for t in model.templates], [f['name'] for f in model.fields]
+                )
+        for file in media_files:
+            manifest.media[Path(file).name] = file_digest(file)
+        return manifest
+
+    @classmethod
+    def from_package(cls, path: Path) -> 'Manifest':
+        """Rebuild the manifest of a package that was written without one"""
+        manifest = cls()
+        with zipfile.ZipFile(path) as package, tempfile.TemporaryDirectory() as temp_dir:
+            entries = set(package.namelist())
+            media_map = json.loads(package.read('media')) if 'media' in entries else {}
+            for index, name in media_map.items():
+                if index in entries:
+                    digest = hashlib.sha256()
+                    with package.open(index) as f:
+                        while chunk := f.read(1 << 20):
+                            digest.update(chunk)
+                    manifest.media[name] = digest.hexdigest()
+
+            collection_name = next((name for name in COLLECTION_NAMES if name in entries), None)
+            if collection_name is None:
+                raise ValueError(f"{path}: no collection database in package")
+            collection_path = Path(temp_dir) / collection_name
+            with package.open(collection_name) as source, open(collection_path, 'wb') as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+
+            connection = sqlite3.connect(collection_path)
+            try:
+                (models_json,) = connection.execute('SELECT models FROM col').fetchone()
+                for model_id, model in json.loads(models_json).items():
+                    manifest.models[model_id] = model_digest(
+                        model['css'], [(t['qfmt'], t['afmt']) for t in model['tmpls']],
+                        [f['name'] for f in model['flds']]
+                    )
+                for guid, model_id, fields, tags in connection.execute('SELECT guid, mid, flds, tags FROM notes'):
+                    manifest.notes[guid] = note_digest(model_id, fields.split('\x1f'), tags.split())
+            finally:
+                connection.close()
+        return manifest
+
+    @classmethod
+    def load(cls, path: str | Path) -> 'Manifest':
+        """Load a manifest file, or derive one from an .apkg"""
+        path = Path(path)
+        if path.suffix == '.apkg':
+            return cls.from_package(path)
+        data = json.loads(path.read_text())
+        return cls(data['version'], data['notes'], data['models'], data['media'])
+
+    def write(self, path: Path) -> None:
+        path.write_text(json.dumps(
+            {'version': self.version, 'notes': self.notes, 'models': self.models, 'media': self.media},
+            sort_keys=True,
+        ))
+
+
+@dataclass
+class DeltaSummary:
+    notes: int
+    media: int
+    removed_notes: int
+
+
+def write_delta_package(deck: genanki.Deck, media_files: Sequence[str], current: Manifest, previous: Manifest,
+                        path: Path, reproducible: bool = False) -> DeltaSummary:
+    """Write a package with only the notes and media that changed since the previous build.
+
+    A note is included when it is new, its fields or tags changed, its model's
+    templates changed, or it references media whose content changed, since
+    Anki would otherwise keep pointing it at the old file. Notes keep their
+    GUIDs and the deck keeps its ID, so Anki updates them in place. Notes
+    removed since the previous build cannot be expressed in a package and
+    are only counted.
+    """
+    changed_media = {name for name, digest in current.media.items() if previous.media.get(name) != digest}
+    changed_models = {model_id for model_id, digest in current.models.items() if previous.models.get(model_id) != digest}
+
+    delta = genanki.Deck(deck.deck_id, deck.name, deck.description)
+    for note in deck.notes:
+        guid = str(note.guid)  # Some decks use integer GUIDs, stored and compared as text like Anki's
+        if (previous.notes.get(guid) != current.notes[guid]
+                or str(note.model.model_id) in changed_models
+                or not changed_media.isdisjoint(media_references('\x1f'.join(note.fields)))):
+            delta.add_note(note)
+
+    package = genanki.Package(delta)
+    package.media_files = [file for file in dict.fromkeys(media_files) if Path(file).name in changed_media]
+    write_package(package, path, reproducible)
+    return DeltaSummary(len(delta.notes), len(package.media_files), len(previous.notes.keys() - current.notes.keys()))
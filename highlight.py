@@ -0,0 +1,67 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import pygments
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+
+from base import CACHE_PATH
+
+HIGHLIGHT_CACHE_PATH = CACHE_PATH / 'highlight'
+PARALLEL_THRESHOLD = 64  # Uncached snippets below which highlighting stays in-process
+CSS_CLASS = 'highlight'
+
+
+def highlight_css(style: str = 'monokai') -> str:
+    """Token colours for highlighted snippets; the card keeps its own background."""
+    formatter = HtmlFormatter(style=style, cssclass=CSS_CLASS, nobackground=True)
+    return formatter.get_style_defs(f'.{CSS_CLASS}') + f'\n.{CSS_CLASS} pre {{ margin: 0; }}\n'
+
+
+def _cache_key(code: str, language: str) -> str:
+    return hashlib.sha256(f'{pygments.__version__}\0{language}\0{code}'.encode()).hexdigest()
+
+
+def _highlight(code: str, language: str) -> str:
+    formatter = HtmlFormatter(cssclass=CSS_CLASS)
+    return pygments.highlight(code, get_lexer_by_name(language), formatter)
+
+
+def highlight_many(snippets: Sequence[str], language: str, cache_path: Path = HIGHLIGHT_CACHE_PATH,
+                   workers: Optional[int] = None) -> list[str]:
+    """Highlight snippets, reusing cached HTML keyed by content hash.
+
+    Snippets that are not cached yet are highlighted in worker processes
+    when there are enough of them to be worth it.
+    """
+    keys = [_cache_key(code, language) for code in snippets]
+    results: dict[str, str] = {}
+    missing: dict[str, str] = {}
+    for key, code in zip(keys, snippets):
+        if key in results or key in missing:
+            continue
+        path = cache_path / f'{key}.html'
+        if path.exists():
+            results[key] = path.read_text(encoding='utf-8')
+        else:
+            missing[key] = code
+
+    if missing:
+        codes = list(missing.values())
+        if len(codes) < PARALLEL_THRESHOLD or workers == 1:
+            rendered = [_highlight(code, language) for code in codes]
+        else:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+                rendered = list(executor.map(_highlight, codes, [language] * len(codes), chunksize=16))
+
+        cache_path.mkdir(parents=True, exist_ok=True)
+        for key, html in zip(missing, rendered):
+            temp_path = cache_path / f'{key}.{os.getpid()}.tmp'
+            temp_path.write_text(html, encoding='utf-8')
+            os.replace(temp_path, cache_path / f'{key}.html')
+            results[key] = html
+
+    return [results[key] for key in keys]
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, TextIO
+
+METRICS_FORMATS = {'jsonl': '.jsonl', 'prometheus': '.prom'}
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class BuildMetrics:
+    """Timing spans, counters and latency histograms recorded during a deck build.
+
+    Spans come from AnkiDeck stages; counters and histograms are recorded by
+    the decks themselves, e.g. cache hits or encode latency. Recording is
+    thread-safe so concurrent stages can share one instance.
+    """
+
+    def __init__(self, deck: str):
+        self.deck = deck
+        self.counters: dict[tuple[str, tuple], float] = defaultdict(float)
+        self.histograms: dict[str, list[int]] = {}
+        self.histogram_sums: dict[str, float] = defaultdict(float)
+        self.stage_seconds: dict[str, float] = defaultdict(float)
+        self.stage_calls: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stream: Optional[TextIO] = None
+
+    def reset(self) -> None:
+        """Drop everything recorded so far, so a deck built again starts from zero."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.histogram_sums.clear()
+            self.stage_seconds.clear()
+            self.stage_calls.clear()
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        with self._lock:
+            self.counters[name, tuple(sorted(labels.items()))] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+            self.histograms[name][bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+            self.histogram_sums[name] += seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        parents = self._local.__dict__.setdefault('parents', [])
+        parent = parents[-1] if parents else None
+        parents.append(name)
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            parents.pop()
+            with self._lock:
+                self.stage_seconds[name] += duration
+                self.stage_calls[name] += 1
+            self._emit({
+                'type': 'span', 'deck': self.deck, 'stage': name, 'parent': parent,
+                'start': started_at, 'duration_seconds': duration,
+            })
+
+    def open_stream(self, path: Path) -> None:
+        """Stream spans to a JSON lines file as they finish."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._stream = open(path, 'w', encoding='utf-8')
+
+    def _emit(self, record: dict) -> None:
+        if self._stream is None:
+            return
+        with self._lock:
+            self._stream.write(json.dumps(record) + '\n')
+            self._stream.flush()
+
+    def close(self) -> None:
+        """Append the counter and histogram totals to the stream and close it."""
+        if self._stream is None:
+            return
+        for (name, labels), value in sorted(self.counters.items()):
+            self._emit({'type': 'counter', 'deck': self.deck, 'name': name, 'labels': dict(labels), 'value': value})
+        for name, counts in sorted(self.histograms.items()):
+            self._emit({
+                'type': 'histogram', 'deck': self.deck, 'name': name,
+                'buckets': dict(zip([*map(str, HISTOGRAM_BUCKETS), '+Inf'], counts)),
+                'count': sum(counts), 'sum': self.histogram_sums[name],
+            })
+        self._stream.close()
+        self._stream = None
+
+    def write_prometheus(self, path: Path) -> None:
+        """Write a node_exporter textfile collector file, replacing it atomically."""
+        deck = self.deck.replace('\\', '\\\\').replace('"', '\\"')
+        lines = [
+            '# TYPE anki_build_stage_seconds_total counter',
+            *(f'anki_build_stage_seconds_total{{deck="{deck}",stage="{name}"}} {seconds:.6f}'
+              for name, seconds in self.stage_seconds.items()),
+            '# TYPE anki_build_stage_calls_total counter',
+            *(f'anki_build_stage_calls_total{{deck="{deck}",stage="{name}"}} {calls}'
+              for name, calls in self.stage_calls.items()),
+        ]
+        for family in sorted({name for name, _ in self.counters}):
+            lines.append(f'# TYPE anki_build_{family} counter')
+            for (name, labels), value in sorted(self.counters.items()):
+                if name == family:
+                    label_text = ''.join(f',{key}="{label}"' for key, label in labels)
+                    lines.append(f'anki_build_{name}{{deck="{deck}"{label_text}}} {value:.15g}')
+        for name, counts in sorted(self.histograms.items()):
+            lines.append(f'# TYPE anki_build_{name} histogram')
+            cumulative = 0
+            for bound, count in zip([*map(str, HISTOGRAM_BUCKETS), '+Inf'], counts):
+                cumulative += count
+                lines.append(f'anki_build_{name}_bucket{{deck="{deck}",le="{bound}"}} {cumulative}')
+            lines.append(f'anki_build_{name}_sum{{deck="{deck}"}} {self.histogram_sums[name]:.6f}')
+            lines.append(f'anki_build_{name}_count{{deck="{deck}"}} {cumulative}')
+        lines.append('# TYPE anki_build_last_success_timestamp_seconds gauge')
+        lines.append(f'anki_build_last_success_timestamp_seconds{{deck="{deck}"}} {time.time():.0f}')
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(path.suffix + '.tmp')
+        temp_path.write_text('\n'.join(lines) + '\n')
+        os.replace(temp_path, path)
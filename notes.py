@@ -0,0 +1,92 @@
+import sys
+from array import array
+from typing import Callable, Iterable, Iterator, Optional
+
+import genanki
+
+
+class NoteStore:
+    """A deck's notes stored column-wise, built into genanki.Note objects only when read.
+
+    Field values of all notes share one flat list with an offsets array,
+    models and tag sets are interned and referenced by index, and GUIDs are
+    computed once when a note is added, so a note costs its strings and a
+    few array slots instead of a Note with its own lists. Notes read from
+    the store are fresh copies each time: changing them does not change the
+    store, use map_fields for that.
+    """
+    __slots__ = ('_models', '_model_ids', '_model_index', '_values', '_offsets', '_tag_sets', '_tag_ids',
+                 '_tag_index', '_guids', '_sort_fields', '_dues')
+
+    def __init__(self, notes: Iterable[genanki.Note] = ()):
+        self._models: list[genanki.Model] = []
+        self._model_ids: dict[int, int] = {}  # id(model) -> index in _models
+        self._model_index = array('H')
+        self._values: list[str] = []
+        self._offsets = array('Q', [0])  # Note i has _values[_offsets[i]:_offsets[i + 1]]
+        self._tag_sets: list[tuple[str, ...]] = []
+        self._tag_ids: dict[tuple[str, ...], int] = {}
+        self._tag_index = array('L')
+        self._guids: list[str] = []
+        self._sort_fields: dict[int, str] = {}  # Only notes with an explicit sort field
+        self._dues: dict[int, int] = {}  # Only notes with a non-zero due
+        for note in notes:
+            self.append(note)
+
+    def _intern_model(self, model: genanki.Model) -> int:
+        index = self._model_ids.get(id(model))
+        if index is None:
+            index = self._model_ids[id(model)] = len(self._models)
+            self._models.append(model)
+        return index
+
+    def _intern_tags(self, tags: Iterable[str]) -> int:
+        key = tuple(sys.intern(tag) for tag in tags)
+        index = self._tag_ids.get(key)
+        if index is None:
+            index = self._tag_ids[key] = len(self._tag_sets)
+            self._tag_sets.append(key)
+        return index
+
+    def add(self, model: genanki.Model, fields: Iterable[str], tags: Iterable[str] = (), guid: Optional[str] = None,
+            sort_field: Optional[str] = None, due: int = 0) -> None:
+        """Add a note from its parts, without building a Note; the GUID defaults to genanki's, from the fields."""
+        start = len(self._values)
+        self._values.extend(fields)
+        if guid is None:
+            guid = genanki.guid_for(*self._values[start:])
+        self._model_index.append(self._intern_model(model))
+        self._offsets.append(len(self._values))
+        self._tag_index.append(self._intern_tags(tags))
+        self._guids.append(guid)
+        if sort_field is not None:
+            self._sort_fields[len(self._guids) - 1] = sort_field
+        if due:
+            self._dues[len(self._guids) - 1] = due
+
+    def append(self, note: genanki.Note) -> None:
+        self.add(note.model, note.fields, note.tags, note.guid, note._sort_field, note.due)
+
+    def map_fields(self, function: Callable[[str], str]) -> None:
+        """Replace every field value with function(value), keeping the GUIDs."""
+        self._values = [function(value) for value in self._values]
+
+    def __len__(self) -> int:
+        return len(self._guids)
+
+    def __getitem__(self, index: int) -> genanki.Note:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('note index out of range')
+        return genanki.Note(
+            model=self._models[self._model_index[index]],
+            fields=self._values[self._offsets[index]:self._offsets[index + 1]],
+            sort_field=self._sort_fields.get(index),
+            tags=self._tag_sets[self._tag_index[index]],
+            guid=self._guids[index],
+            due=self._dues.get(index, 0),
+        )
+
+    def __iter__(self) -> Iterator[genanki.Note]:
+        return (self[index] for index in range(len(self)))
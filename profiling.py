@@ -0,0 +1,141 @@
+import cProfile
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+@dataclass
+class _ActiveStage:
+    name: str
+    profile: cProfile.Profile
+    base_bytes: int
+    peak_bytes: int = 0
+
+
+class StageProfiler:
+    """cProfile and tracemalloc measurements per build stage.
+
+    Nested stages suspend the enclosing stage's profiler, so every function
+    call is attributed to exactly one stage. Wall time and peak memory are
+    inclusive of nested stages. cProfile only sees the thread it runs in,
+    so work handed to pool threads is profiled separately through worker()
+    and merged into the stage that was active when it ran.
+    """
+
+    def __init__(self):
+        self.stats: dict[str, pstats.Stats] = {}
+        self.calls: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.peak_bytes: dict[str, int] = defaultdict(int)
+        self.worker_calls: dict[str, int] = defaultdict(int)  # Profiled worker calls per worker name
+        self._active: list[_ActiveStage] = []
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        outer = self._active[-1] if self._active else None
+        if outer is not None:
+            outer.profile.disable()
+            outer.peak_bytes = max(outer.peak_bytes, tracemalloc.get_traced_memory()[1] - outer.base_bytes)
+
+        self.calls.setdefault(name, 0)  # Report stages in the order they are first entered
+        tracemalloc.reset_peak()
+        active = _ActiveStage(name, cProfile.Profile(), tracemalloc.get_traced_memory()[0])
+        self._active.append(active)
+        start = time.perf_counter()
+        active.profile.enable()
+        try:
+            yield
+        finally:
+            active.profile.disable()
+            self._active.pop()
+            self.calls[name] += 1
+            self.seconds[name] += time.perf_counter() - start
+            peak = max(active.peak_bytes, tracemalloc.get_traced_memory()[1] - active.base_bytes)
+            self.peak_bytes[name] = max(self.peak_bytes[name], peak)
+            self._add_stats(name, active.profile)
+
+            if outer is not None:
+                outer.peak_bytes = max(outer.peak_bytes, peak + active.base_bytes - outer.base_bytes)
+                tracemalloc.reset_peak()
+                outer.profile.enable()
+            elif self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    @contextmanager
+    def worker(self, name: str) -> Iterator[None]:
+        """Profile a call on a pool thread and add it to the stage active in the building thread.
+
+        Peak memory needs nothing extra, since tracemalloc traces every
+        thread. On Python versions that allow only one active profiler per
+        process, worker calls go unprofiled and the report says so.
+        """
+        owner = self._active[-1].name if self._active else name
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._add_stats(owner, profile)
+            with self._lock:
+                self.worker_calls[name if profile is not None else f'{name} (not profiled)'] += 1
+
+    def _add_stats(self, name: str, profile: cProfile.Profile) -> None:
+        try:
+            stats = pstats.Stats(profile)
+        except TypeError:  # Nothing was recorded
+            return
+        with self._lock:
+            if name in self.stats:
+                self.stats[name].add(stats)
+            else:
+                self.stats[name] = stats
+
+    def format_table(self) -> str:
+        rows = [f"{'Stage':<20} {'Calls':>7} {'Seconds':>10} {'Peak MiB':>10}"]
+        for name in self.calls:
+            rows.append(
+                f"{name:<20} {self.calls[name]:>7} {self.seconds[name]:>10.3f} "
+                f"{self.peak_bytes[name] / 2 ** 20:>10.2f}"
+            )
+        if self.worker_calls:
+            rows.append("Worker thread calls merged into their stage's .pstats: "
+                        + ', '.join(f'{name} {calls}' for name, calls in self.worker_calls.items()))
+        return '\n'.join(rows)
+
+    def write_report(self, path: Path, stem: str) -> None:
+        """Write per-stage and combined .pstats files plus the stage table.
+
+        The .pstats files load in snakeviz, flameprof or gprof2dot.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        combined = None
+        for name, stats in self.stats.items():
+            stats.dump_stats(path / f'{stem}.{name}.pstats')
+            if combined is None:
+                combined = pstats.Stats(str(path / f'{stem}.{name}.pstats'))
+            else:
+                combined.add(stats)
+        if combined is not None:
+            combined.dump_stats(path / f'{stem}.pstats')
+
+        table = self.format_table()
+        (path / f'{stem}.stages.txt').write_text(table + '\n')
+        print(table)
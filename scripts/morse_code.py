@@ -1,13 +1,18 @@
-from base import AnkiDeck, DeckMetadata
+from audio import AugmentationConfig, augment_pcm, encode_pcm
+from base import AnkiDeck, BuildOptions, DeckMetadata
 import genanki
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import numpy as np
 from pydub import AudioSegment
 from pydub.generators import Sine
 import os
+import random
+import string
 from pathlib import Path
 from abc import ABC
 import hashlib
+import itertools
+import warnings
 
 
 class BaseMorseDeck(AnkiDeck, ABC):
@@ -22,8 +27,9 @@ class BaseMorseDeck(AnkiDeck, ABC):
         '9': '----.'
     }
 
-    def __init__(self, metadata: DeckMetadata):
+    def __init__(self, metadata: DeckMetadata, audio_format: str = 'mp3'):
         super().__init__(metadata)
+        self.audio_format = audio_format
         self.dot_duration = 100  # milliseconds
         self.dash_duration = self.dot_duration * 3
         self.element_gap = self.dot_duration
@@ -31,7 +37,6 @@ class BaseMorseDeck(AnkiDeck, ABC):
         self.frequency = 800  # Hz
         self.audio_path = Path('media')
         self.audio_path.mkdir(exist_ok=True)
-        self.generate_audio_files()
 
         # Generate a unique model ID based on the deck type
         self._model_id = self._generate_model_id()
@@ -115,14 +120,25 @@ class BaseMorseDeck(AnkiDeck, ABC):
 
         return audio
 
+    def audio_filename(self, char: str) -> str:
+        return f'morse_{char}.{self.audio_format}'
+
+    def generate_media(self) -> None:
+        self.generate_audio_files()
+
     def generate_audio_files(self) -> None:
         for char, morse in self.MORSE_CODE.items():
-            filename = f'morse_{char}.mp3'
+            filename = self.audio_filename(char)
             filepath = self.audio_path / filename
 
             if not filepath.exists():  # Only generate if file doesn't exist
+                self.metrics.increment('cache_misses_total', cache='morse_audio')
                 audio = self.generate_morse_audio(morse)
-                audio.export(str(filepath), format='mp3')
+                samples = np.array(audio.get_array_of_samples(), dtype=np.int16)
+                with self.metrics.timer('encode_seconds'):
+                    encode_pcm(samples, audio.frame_rate, filepath, self.audio_format)
+            else:
+                self.metrics.increment('cache_hits_total', cache='morse_audio')
 
             self.media_files.append(str(filepath))
 
@@ -172,7 +188,7 @@ class VisualToMorseDeck(BaseMorseDeck):
                     </div>
                 '''
             }],
-            css=self.get_custom_css()
+            css=self.shared_css(self.get_custom_css())
         )
 
     def generate_cards(self) -> list[genanki.Note]:
@@ -180,7 +196,7 @@ class VisualToMorseDeck(BaseMorseDeck):
         notes = []
 
         for char, morse in self.MORSE_CODE.items():
-            audio_tag = f'[sound:morse_{char}.mp3]'
+            audio_tag = f'[sound:{self.audio_filename(char)}]'
             note = genanki.Note(
                 model=model,
                 fields=[char, morse, audio_tag],
@@ -218,7 +234,7 @@ class MorseToVisualDeck(BaseMorseDeck):
                     </div>
                 '''
             }],
-            css=self.get_custom_css()
+            css=self.shared_css(self.get_custom_css())
         )
 
     def generate_cards(self) -> list[genanki.Note]:
@@ -226,7 +242,7 @@ class MorseToVisualDeck(BaseMorseDeck):
         notes = []
 
         for char, morse in self.MORSE_CODE.items():
-            audio_tag = f'[sound:morse_{char}.mp3]'
+            audio_tag = f'[sound:{self.audio_filename(char)}]'
             note = genanki.Note(
                 model=model,
                 fields=[char, morse, audio_tag],
@@ -264,7 +280,7 @@ class AudioToVisualDeck(BaseMorseDeck):
                     </div>
                 '''
             }],
-            css=self.get_custom_css()
+            css=self.shared_css(self.get_custom_css())
         )
 
     def generate_cards(self) -> list[genanki.Note]:
@@ -272,7 +288,7 @@ class AudioToVisualDeck(BaseMorseDeck):
         notes = []
 
         for char, morse in self.MORSE_CODE.items():
-            audio_tag = f'[sound:morse_{char}.mp3]'
+            audio_tag = f'[sound:{self.audio_filename(char)}]'
             note = genanki.Note(
                 model=model,
                 fields=[char, morse, audio_tag],
@@ -284,7 +300,251 @@ class AudioToVisualDeck(BaseMorseDeck):
         return notes
 
 
+class NoisyAudioToVisualDeck(AudioToVisualDeck):
+    """Audio to character cards copied under seeded noise, fading and interference."""
+
+    def __init__(self, metadata: DeckMetadata, variants: int = 5,
+                 augmentation: AugmentationConfig = AugmentationConfig(), audio_format: str = 'mp3'):
+        self.variants = variants
+        self.augmentation = augmentation
+        super().__init__(metadata, audio_format)
+
+    def variant_seeds(self, char: str) -> list[int]:
+        """Stable seeds per character, so every rebuild renders the same variants."""
+        return [
+            int(hashlib.md5(f"{char}_{index}_{self.augmentation.key()}".encode()).hexdigest()[:8], 16)
+            for index in range(self.variants)
+        ]
+
+    def variant_filename(self, char: str, seed: int) -> str:
+        return f'morse_{char}_{self.augmentation.key()}_{seed}.{self.audio_format}'
+
+    def generate_audio_files(self) -> None:
+        for char, morse in self.MORSE_CODE.items():
+            seeds = self.variant_seeds(char)
+            filepaths = [self.audio_path / self.variant_filename(char, seed) for seed in seeds]
+            missing = [(seed, filepath) for seed, filepath in zip(seeds, filepaths) if not filepath.exists()]
+
+            self.metrics.increment('cache_hits_total', len(seeds) - len(missing), cache='morse_variants')
+            self.metrics.increment('cache_misses_total', len(missing), cache='morse_variants')
+            if missing:  # Render all uncached variants of a character in one batch
+                audio = self.generate_morse_audio(morse)
+                clean = np.array(audio.get_array_of_samples(), dtype=np.int16)
+                with self.metrics.timer('render_seconds'):
+                    batch = augment_pcm(clean, audio.frame_rate, [seed for seed, _ in missing], self.augmentation)
+                for samples, (_, filepath) in zip(batch, missing):
+                    with self.metrics.timer('encode_seconds'):
+                        encode_pcm(samples, audio.frame_rate, filepath, self.audio_format)
+
+            self.media_files.extend(str(filepath) for filepath in filepaths)
+
+    def generate_cards(self) -> list[genanki.Note]:
+        model = self.create_model()
+        notes = []
+
+        for char, morse in self.MORSE_CODE.items():
+            for seed in self.variant_seeds(char):
+                note = genanki.Note(
+                    model=model,
+                    fields=[char, morse, f'[sound:{self.variant_filename(char, seed)}]'],
+                    guid=self._generate_note_id(f'{char}_{seed}'),
+                    tags=self.metadata.tags + ['audio-to-visual', 'noisy']
+                )
+                notes.append(note)
+
+        return notes
+
+
+Q_CODES = (
+    'QRL', 'QRM', 'QRN', 'QRO', 'QRP', 'QRQ', 'QRS', 'QRT', 'QRU', 'QRV',
+    'QRX', 'QRZ', 'QSB', 'QSL', 'QSO', 'QSP', 'QSY', 'QTH', 'QTR', 'QRG',
+)
+
+
+def read_corpus(path: str | Path) -> Iterator[str]:
+    """Stream one entry per line, skipping blank lines and # comments."""
+    with open(path, encoding='utf-8') as corpus:
+        for line in corpus:
+            entry = line.strip()
+            if entry and not entry.startswith('#'):
+                yield entry
+
+
+def synthetic_call_signs(count: int, seed: int = 0) -> Iterator[str]:
+    """Generate plausible amateur radio call signs, e.g. W1AW, DL3XYZ or 2E0ABC."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        if rng.random() < 0.2:
+            prefix = rng.choice(string.digits[1:]) + rng.choice(string.ascii_uppercase)
+        else:
+            prefix = ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 2)))
+        suffix = ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 3)))
+        yield f'{prefix}{rng.choice(string.digits)}{suffix}'
+
+
+class BloomFilter:
+    """Fixed-size set membership test with no false negatives.
+
+    The default 16 MiB gives about one false positive per billion lookups
+    after a million entries, and one in a thousand after ten million.
+    """
+
+    def __init__(self, bits: int = 2 ** 27, hashes: int = 7):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray(bits // 8)
+
+    def add(self, item: str) -> bool:
+        """Add the item, returning whether it was (probably) added before."""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        start, step = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        present = True
+        for i in range(self.hashes):
+            byte, bit = divmod((start + i * step) % self.bits, 8)
+            if not self._array[byte] & (1 << bit):
+                present = False
+                self._array[byte] |= 1 << bit
+        return present
+
+
+class MorseCorpusDeck(BaseMorseDeck):
+    """Audio drills for whole words, Q-codes or call signs streamed from a corpus.
+
+    Entries are deduplicated with a fixed-size Bloom filter and rendered one
+    at a time, so memory does not grow with the corpus apart from the notes
+    and media list the package is written from. A false positive drops an
+    entry as a duplicate, which the duplicate count in the metrics includes.
+    """
+    SAMPLE_RATE = 44100  # Hz
+    AMPLITUDE = 0.8
+
+    def __init__(self, metadata: DeckMetadata, corpus: Iterable[str] | str | Path, wpm: Optional[int] = None,
+                 audio_format: str = 'mp3'):
+        self.corpus = corpus
+        super().__init__(metadata, audio_format)
+        if wpm is not None:
+            self.dot_duration = 1200 / wpm  # PARIS timing, milliseconds
+        self._units, self._unit_offsets, self._unit_lengths = self._build_timing_table()
+
+    def generate_audio_files(self) -> None:
+        # Audio is rendered per corpus entry while notes are streamed
+        pass
+
+    @classmethod
+    def _build_timing_table(cls) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Key-down/key-up pattern per byte, one entry per dot-length unit."""
+        patterns = {ord(' '): [0] * 4}  # word gap of 7 units, 3 come from the previous letter gap
+        for char, morse in cls.MORSE_CODE.items():
+            units = []
+            for symbol in morse:
+                units += [1, 0] if symbol == '.' else [1, 1, 1, 0]
+            patterns[ord(char)] = units + [0, 0]
+
+        offsets = np.zeros(256, dtype=np.int64)
+        lengths = np.zeros(256, dtype=np.int64)
+        flat = []
+        for code, units in patterns.items():
+            offsets[code] = len(flat)
+            lengths[code] = len(units)
+            flat += units
+        return np.array(flat, dtype=np.float32), offsets, lengths
+
+    def text_to_timing(self, text: str) -> np.ndarray:
+        codes = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+        lengths = self._unit_lengths[codes]
+        starts = np.repeat(self._unit_offsets[codes] - np.cumsum(lengths) + lengths, lengths)
+        units = self._units[starts + np.arange(lengths.sum())]
+        # Drop the trailing letter gap so clips end one element gap after the last tone
+        return units[:len(units) - 2]
+
+    def timing_to_pcm(self, units: np.ndarray) -> np.ndarray:
+        samples_per_unit = round(self.SAMPLE_RATE * self.dot_duration / 1000)
+        keying = np.repeat(units, samples_per_unit)
+        t = np.arange(len(keying)) / self.SAMPLE_RATE
+        tone = np.sin(2 * np.pi * self.frequency * t) * keying
+        return (tone * self.AMPLITUDE * 32767).astype(np.int16)
+
+    def _iter_entries(self) -> Iterator[str]:
+        entries = read_corpus(self.corpus) if isinstance(self.corpus, (str, Path)) else self.corpus
+        seen = BloomFilter()
+        unsupported, first_unsupported = 0, None
+        for entry in entries:
+            text = ' '.join(entry.upper().split())
+            if not text:
+                continue
+            if not all(char == ' ' or char in self.MORSE_CODE for char in text):
+                self.metrics.increment('corpus_entries_skipped_total', reason='unsupported')
+                first_unsupported = first_unsupported or entry
+                unsupported += 1
+                continue
+            if seen.add(text):
+                self.metrics.increment('corpus_entries_skipped_total', reason='duplicate')
+                continue
+            yield text
+        if unsupported:
+            warnings.warn(f"Skipped {unsupported} corpus entries with characters that have no Morse code, "
+                          f"e.g. {first_unsupported!r}")
+
+    def create_model(self) -> genanki.Model:
+        return genanki.Model(
+            self._model_id,
+            'Morse Corpus Model',
+            fields=[
+                {'name': 'Text'},
+                {'name': 'MorseCode'},
+                {'name': 'Audio'}
+            ],
+            templates=[{
+                'name': 'Audio to Text',
+                'qfmt': '''
+                    <div class="content">
+                        <div class="audio-controls">{{Audio}}</div>
+                    </div>
+                ''',
+                'afmt': '''
+                    {{FrontSide}}
+                    <hr>
+                    <div class="content">
+                        <div class="character">{{Text}}</div>
+                        <div class="morse">{{MorseCode}}</div>
+                    </div>
+                '''
+            }],
+            css=self.shared_css(self.get_custom_css())
+        )
+
+    def generate_cards(self) -> Iterator[genanki.Note]:
+        model = self.create_model()
+        tags = self.metadata.tags + ['corpus']
+
+        for text in self._iter_entries():
+            # Timing and tone are part of the name, so changing them never reuses cached clips
+            filename = (f'morse_corpus_{text.replace(" ", "_")}_{self.dot_duration:g}ms_{self.frequency:g}hz'
+                        f'.{self.audio_format}')
+            filepath = self.audio_path / filename
+
+            if not filepath.exists():  # Only generate if file doesn't exist
+                self.metrics.increment('cache_misses_total', cache='morse_corpus_audio')
+                with self.metrics.timer('render_seconds'):
+                    pcm = self.timing_to_pcm(self.text_to_timing(text))
+                with self.metrics.timer('encode_seconds'):
+                    encode_pcm(pcm, self.SAMPLE_RATE, filepath, self.audio_format)
+            else:
+                self.metrics.increment('cache_hits_total', cache='morse_corpus_audio')
+            self.media_files.append(str(filepath))
+
+            morse = ' / '.join(' '.join(self.MORSE_CODE[char] for char in word) for word in text.split())
+            yield genanki.Note(
+                model=model,
+                fields=[text, morse, f'[sound:{filename}]'],
+                guid=self._generate_note_id(text),
+                tags=tags
+            )
+
+
 if __name__ == "__main__":
+    options = BuildOptions.from_args()
+
     # Create Visual to Morse deck
     visual_to_morse = VisualToMorseDeck(
         DeckMetadata(
@@ -294,7 +554,7 @@ if __name__ == "__main__":
             version="1.0",
         )
     )
-    visual_to_morse.save_deck("morse_visual_to_morse.apkg")
+    visual_to_morse.save_deck("morse_visual_to_morse.apkg", options)
 
     # Create Morse to Visual deck
     morse_to_visual = MorseToVisualDeck(
@@ -305,7 +565,7 @@ if __name__ == "__main__":
             version="1.0",
         )
     )
-    morse_to_visual.save_deck("morse_morse_to_visual.apkg")
+    morse_to_visual.save_deck("morse_morse_to_visual.apkg", options)
 
     # Create Audio to Visual deck
     audio_to_visual = AudioToVisualDeck(
@@ -316,7 +576,33 @@ if __name__ == "__main__":
             version="1.0",
         )
     )
-    audio_to_visual.save_deck("morse_audio_to_visual.apkg")
+    audio_to_visual.save_deck("morse_audio_to_visual.apkg", options)
 
     # Clean up media files (only after all decks are created)
-    visual_to_morse.cleanup_media()
\ No newline at end of file
+    visual_to_morse.cleanup_media()
+
+    # Create Audio to Visual deck with band noise, fading and interference
+    noisy_audio_to_visual = NoisyAudioToVisualDeck(
+        DeckMetadata(
+            title="Morse Code: Noisy Audio Morse to Character",
+            tags=["morse-code", "audio-to-visual", "noisy"],
+            description="Practice identifying characters from Morse code audio under static, fading and QRM",
+            version="1.0",
+        )
+    )
+    noisy_audio_to_visual.save_deck("morse_noisy_audio_to_visual.apkg", options)
+    noisy_audio_to_visual.cleanup_media()
+
+    # Create call sign copying deck from a synthetic corpus
+    call_signs = MorseCorpusDeck(
+        DeckMetadata(
+            title="Morse Code: Call Signs and Q-Codes at 20 WPM",
+            tags=["morse-code", "audio-to-visual", "call-signs"],
+            description="Practice copying call signs and Q-codes from Morse code audio at word speed",
+            version="1.0",
+        ),
+        corpus=itertools.chain(Q_CODES, synthetic_call_signs(500)),
+        wpm=20,
+    )
+    call_signs.save_deck("morse_call_signs.apkg", options)
+    call_signs.cleanup_media()
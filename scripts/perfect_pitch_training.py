@@ -1,13 +1,78 @@
-from io import BytesIO
-
-from pydub import AudioSegment
-
-from base import AnkiDeck, DeckMetadata
+from audio import encode_pcm
+from base import AnkiDeck, BuildOptions, DeckMetadata, process_cache, source_digest
 import genanki
 import numpy as np
-from scipy.io import wavfile
 import os
 import random
+from collections import OrderedDict
+from pathlib import Path
+from typing import Sequence
+
+
+# Ratios from C within one octave for the non-equal tuning systems
+TUNING_SYSTEMS = {
+    'equal': [2 ** (semitone / 12) for semitone in range(12)],
+    'just': [1, 16 / 15, 9 / 8, 6 / 5, 5 / 4, 4 / 3, 45 / 32, 3 / 2, 8 / 5, 5 / 3, 9 / 5, 15 / 8],
+    'pythagorean': [1, 256 / 243, 9 / 8, 32 / 27, 81 / 64, 4 / 3, 729 / 512, 3 / 2, 128 / 81, 27 / 16, 16 / 9, 243 / 128],
+}
+
+# Timbre -> (harmonic weights starting at the fundamental, envelope name)
+TIMBRES = {
+    'piano': ([1.0, 0.5, 0.25, 0.125], 'decay'),
+    'sine': ([1.0], 'decay'),
+    'organ': ([1.0, 0.8, 0.6, 0.0, 0.4, 0.0, 0.0, 0.3], 'sustain'),
+    'bright': ([1.0, 0.7, 0.5, 0.35, 0.25, 0.15], 'decay'),
+}
+SOURCE_DIGEST = source_digest(__file__)  # Part of synthesized audio keys, so editing the synthesis invalidates them
+
+
+class HarmonicBank:
+    """Partial waveforms and envelopes shared by every tuning and timbre variant of a build."""
+    MAX_PARTIALS = 512  # ~90 MB of one second float32 partials
+
+    def __init__(self, sample_rate: int, duration: float):
+        self.sample_rate = sample_rate
+        self.t = np.arange(int(sample_rate * duration), dtype=np.float64) / sample_rate
+        self._partials: OrderedDict[float, np.ndarray] = OrderedDict()
+        self._envelopes: dict[str, np.ndarray] = {}
+
+    def partial(self, frequency: float) -> np.ndarray:
+        key = round(frequency, 6)
+        if key in self._partials:
+            self._partials.move_to_end(key)
+            return self._partials[key]
+
+        partial = np.sin(2 * np.pi * frequency * self.t).astype(np.float32)
+        self._partials[key] = partial
+        if len(self._partials) > self.MAX_PARTIALS:
+            self._partials.popitem(last=False)
+        return partial
+
+    def envelope(self, name: str) -> np.ndarray:
+        if name not in self._envelopes:
+            total_samples = len(self.t)
+            if name == 'decay':
+                attack, decay, sustain_level, release = 0.02, 0.1, 0.7, 0.3
+            else:
+                attack, decay, sustain_level, release = 0.05, 0.0, 1.0, 0.2
+            attack_samples = int(attack * self.sample_rate)
+            decay_samples = int(decay * self.sample_rate)
+            release_samples = int(release * self.sample_rate)
+
+            envelope = np.ones(total_samples, dtype=np.float32) * sustain_level
+            envelope[:attack_samples] = np.linspace(0, 1, attack_samples)
+            envelope[attack_samples:attack_samples + decay_samples] = np.linspace(1, sustain_level, decay_samples)
+            envelope[-release_samples:] = np.linspace(sustain_level, 0, release_samples)
+            self._envelopes[name] = envelope
+        return self._envelopes[name]
+
+    def tone(self, frequency: float, timbre: str) -> np.ndarray:
+        """Assemble a normalized tone from cached partials instead of synthesizing it."""
+        weights, envelope = TIMBRES[timbre]
+        harmonics = [(harmonic, weight) for harmonic, weight in enumerate(weights, start=1) if weight]
+        partials = np.stack([self.partial(frequency * harmonic) for harmonic, _ in harmonics])
+        tone = np.array([weight for _, weight in harmonics], dtype=np.float32) @ partials
+        return tone / np.max(np.abs(tone)) * self.envelope(envelope)
 
 
 class PerfectPitchDeck(AnkiDeck):
@@ -17,61 +82,77 @@ class PerfectPitchDeck(AnkiDeck):
     BASE_NOTES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
     OCTAVES = range(3, 6)  # C3 to B5
 
-    def __init__(self, metadata: DeckMetadata):
+    def __init__(self, metadata: DeckMetadata, audio_format: str = 'mp3', a4_frequency: float = 440.0,
+                 tuning: str = 'equal', timbre: str = 'piano', harmonic_bank: HarmonicBank | None = None):
         super().__init__(metadata)
+        if tuning not in TUNING_SYSTEMS:
+            raise ValueError(f"Unknown tuning system: {tuning}")
+        if timbre not in TIMBRES:
+            raise ValueError(f"Unknown timbre: {timbre}")
+        self.audio_format = audio_format
+        self.a4_frequency = a4_frequency
+        self.tuning = tuning
+        self.timbre = timbre
+        self.harmonic_bank = harmonic_bank or process_cache(
+            ('harmonic_bank', SOURCE_DIGEST, self.SAMPLE_RATE, self.DURATION), lambda: HarmonicBank(self.SAMPLE_RATE, self.DURATION)
+        )
         self.note_frequencies = self._generate_frequencies()
 
     def _generate_frequencies(self) -> dict[str, float]:
         """Generate frequencies for all notes."""
         frequencies = {}
-        A4_FREQ = 440.0
         A4_OCTAVE = 4
         A4_NOTE = 9  # Index of A in BASE_NOTES
+        ratios = TUNING_SYSTEMS[self.tuning]
+        c4_frequency = self.a4_frequency / ratios[A4_NOTE]  # Keeps A4 at the reference pitch
 
         for octave in self.OCTAVES:
             for note in self.BASE_NOTES:
                 note_name = f"{note}{octave}"
                 note_idx = self.BASE_NOTES.index(note)
-                semitone_distance = (octave - A4_OCTAVE) * 12 + (note_idx - A4_NOTE)
-                frequencies[note_name] = A4_FREQ * (2 ** (semitone_distance / 12.0))
+                frequencies[note_name] = c4_frequency * ratios[note_idx] * 2 ** (octave - A4_OCTAVE)
         return frequencies
 
     def _generate_piano_like_tone(self, frequency: float) -> np.ndarray:
-        """Generate a more pleasant piano-like tone with harmonics."""
-        t = np.linspace(0, self.DURATION, int(self.SAMPLE_RATE * self.DURATION), False)
-
-        tone = np.zeros_like(t)
-        harmonics = [1, 2, 3, 4]
-        harmonic_weights = [1.0, 0.5, 0.25, 0.125]
-
-        for harmonic, weight in zip(harmonics, harmonic_weights):
-            tone += weight * np.sin(2 * np.pi * frequency * harmonic * t)
-
-        tone = tone / np.max(np.abs(tone))
+        """Generate a tone in the deck's timbre as 16-bit PCM."""
+        return (self._synthesize_tone(frequency) * self.AMPLITUDE * 32767).astype(np.int16)
 
-        total_samples = len(tone)
-        attack_samples = int(0.02 * self.SAMPLE_RATE)
-        decay_samples = int(0.1 * self.SAMPLE_RATE)
-        sustain_level = 0.7
-        release_samples = int(0.3 * self.SAMPLE_RATE)
+    def _synthesize_tone(self, frequency: float) -> np.ndarray:
+        """Normalized tone with envelope, before scaling to 16-bit PCM."""
+        return self.harmonic_bank.tone(frequency, self.timbre)
 
-        envelope = np.ones(total_samples) * sustain_level
-        envelope[:attack_samples] = np.linspace(0, 1, attack_samples)
-        envelope[attack_samples:attack_samples + decay_samples] = np.linspace(1, sustain_level, decay_samples)
-        envelope[-release_samples:] = np.linspace(sustain_level, 0, release_samples)
+    def _save_audio(self, audio_data: np.ndarray, filename: str):
+        """Encode numpy array to an audio file in the deck's format."""
+        with self.metrics.timer('encode_seconds'):
+            encode_pcm(audio_data, self.SAMPLE_RATE, filename, self.audio_format, bitrate="192k")
 
-        return (tone * envelope * self.AMPLITUDE * 32767).astype(np.int16)
-
-    def _save_audio_as_mp3(self, audio_data: np.ndarray, filename: str):
-        """Convert numpy array to MP3 file using pydub."""
-        # First save as WAV in memory
-        wav_io = BytesIO()
-        wavfile.write(wav_io, self.SAMPLE_RATE, audio_data)
-        wav_io.seek(0)
-
-        # Convert to MP3
-        audio_segment = AudioSegment.from_wav(wav_io)
-        audio_segment.export(filename, format="mp3", bitrate="192k")
+    def get_custom_css(self) -> str:
+        return '''
+            .card {
+                font-family: Arial, sans-serif;
+                font-size: 28px;
+                text-align: center;
+                color: black;
+                background-color: white;
+                padding: 20px;
+            }
+            .question {
+                margin-top: 20px;
+            }
+            .answer {
+                margin-top: 20px;
+            }
+            .note {
+                color: #2196F3;
+                font-weight: bold;
+                font-size: 36px;
+            }
+            .details {
+                color: #666;
+                font-size: 18px;
+                margin-top: 10px;
+            }
+        '''
 
     def create_model(self) -> genanki.Model:
         return genanki.Model(
@@ -100,32 +181,7 @@ class PerfectPitchDeck(AnkiDeck):
                     </div>
                 '''
             }],
-            css='''
-                .card {
-                    font-family: Arial, sans-serif;
-                    font-size: 28px;
-                    text-align: center;
-                    color: black;
-                    background-color: white;
-                    padding: 20px;
-                }
-                .question {
-                    margin-top: 20px;
-                }
-                .answer {
-                    margin-top: 20px;
-                }
-                .note {
-                    color: #2196F3;
-                    font-weight: bold;
-                    font-size: 36px;
-                }
-                .details {
-                    color: #666;
-                    font-size: 18px;
-                    margin-top: 10px;
-                }
-            '''
+            css=self.shared_css(self.get_custom_css())
         )
 
     def generate_cards(self) -> list[genanki.Note]:
@@ -136,36 +192,273 @@ class PerfectPitchDeck(AnkiDeck):
         for note_name, frequency in self.note_frequencies.items():
             note_data.append((note_name, frequency))
 
-        random.shuffle(note_data)
+        self.random.shuffle(note_data)
 
         for note_name, frequency in note_data:
-            audio_data = self._generate_piano_like_tone(frequency)
-            audio_filename = f'note_{note_name.replace("#", "sharp")}.mp3'
-            self._save_audio_as_mp3(audio_data, audio_filename)
+            # Named by timbre and frequency so notes that coincide across tunings share one clip
+            audio_filename = f'pitch_{self.timbre}_{frequency:.2f}'.replace('.', '_') + f'.{self.audio_format}'
+            if not os.path.exists(audio_filename):
+                # Encoded clips stay in memory, so watch mode rebuilds only write them back out
+                key = ('pitch_audio', SOURCE_DIGEST, audio_filename, self.SAMPLE_RATE, self.DURATION, self.AMPLITUDE)
+                with self.stage('generate_media'):
+                    clip = process_cache(key, lambda: self._render_clip(frequency, audio_filename))
+                    if not os.path.exists(audio_filename):
+                        self.metrics.increment('cache_hits_total', cache='pitch_audio')
+                        Path(audio_filename).write_bytes(clip)
+            else:
+                self.metrics.increment('cache_hits_total', cache='pitch_audio')
             self.media_files.append(audio_filename)
 
             octave = note_name[-1]
             note_without_octave = note_name[:-1]
-            note = genanki.Note(
-                model=model,
-                fields=[
-                    f'[sound:{audio_filename}]',
-                    note_without_octave,
-                    octave,
-                    f'{frequency:.2f}'
-                ]
-            )
+            fields = [f'[sound:{audio_filename}]', note_without_octave, octave, f'{frequency:.2f}']
+            if (self.a4_frequency, self.tuning, self.timbre) == (440.0, 'equal', 'piano'):
+                # The default deck's GUIDs come from its original per-note clip names, so reimports update in place
+                guid = genanki.guid_for(f'[sound:note_{note_name.replace("#", "sharp")}.mp3]', *fields[1:])
+            else:
+                guid = genanki.guid_for(*fields)
+            note = genanki.Note(model=model, fields=fields, guid=guid)
             notes.append(note)
 
         return notes
 
+    def _render_clip(self, frequency: float, audio_filename: str) -> bytes:
+        self.metrics.increment('cache_misses_total', cache='pitch_audio')
+        with self.metrics.timer('render_seconds'):
+            audio_data = self._generate_piano_like_tone(frequency)
+        self._save_audio(audio_data, audio_filename)
+        return Path(audio_filename).read_bytes()
+
     def cleanup(self):
         """Clean up generated audio files."""
         for file in self.media_files:
-            os.remove(file)
+            if os.path.exists(file):  # Clips can be shared with other decks of the same build
+                os.remove(file)
+
+
+class NoteBank:
+    """Every note of a deck rendered once; combinations are mixed from the cached buffers."""
+
+    def __init__(self, deck: PerfectPitchDeck):
+        self.sample_rate = deck.SAMPLE_RATE
+        self.amplitude = deck.AMPLITUDE
+        self.index = {note_name: i for i, note_name in enumerate(deck.note_frequencies)}
+        self.buffers = np.stack([
+            deck._synthesize_tone(frequency) for frequency in deck.note_frequencies.values()
+        ]).astype(np.float32)
+
+    def mix(self, note_names: Sequence[str], offsets: Sequence[float] | None = None) -> np.ndarray:
+        """Sum the cached notes, each starting at its offset in seconds, into 16-bit PCM."""
+        buffers = self.buffers[[self.index[note_name] for note_name in note_names]]
+        if offsets is None:
+            audio = buffers.sum(axis=0)
+        else:
+            starts = np.round(np.asarray(offsets) * self.sample_rate).astype(np.int64)
+            length = buffers.shape[1]
+            audio = np.zeros(starts.max() + length, dtype=np.float32)
+            # Scatter-add every buffer at its offset in one call
+            positions = (starts[:, None] + np.arange(length)).ravel()
+            np.add.at(audio, positions, buffers.ravel())
+
+        return (audio / np.max(np.abs(audio)) * self.amplitude * 32767).astype(np.int16)
+
+
+class CombinationDeck(PerfectPitchDeck):
+    """Pitch decks whose cards play several notes mixed from a shared NoteBank."""
+
+    def __init__(self, metadata: DeckMetadata, audio_format: str = 'mp3', bank: NoteBank | None = None):
+        super().__init__(metadata, audio_format)
+        self.bank = bank or NoteBank(self)
+        self.note_names = list(self.note_frequencies)
+
+    def _audio_filename(self, prefix: str, note_names: Sequence[str]) -> str:
+        joined = '_'.join(note_name.replace('#', 'sharp') for note_name in note_names)
+        return f'{prefix}_{joined}.{self.audio_format}'
+
+    def _save_combination(self, filename: str, note_names: Sequence[str],
+                          offsets: Sequence[float] | None = None) -> str:
+        if not os.path.exists(filename):  # Decks sharing a bank also share rendered clips
+            self.metrics.increment('cache_misses_total', cache='pitch_combinations')
+            with self.stage('generate_media'):
+                with self.metrics.timer('render_seconds'):
+                    audio_data = self.bank.mix(note_names, offsets)
+                self._save_audio(audio_data, filename)
+        else:
+            self.metrics.increment('cache_hits_total', cache='pitch_combinations')
+        self.media_files.append(filename)
+        return f'[sound:{filename}]'
+
+    def _create_combination_model(self, name: str, question: str, fields: list[str]) -> genanki.Model:
+        details = ''.join(f'{field}: {{{{{field}}}}}<br>' for field in fields[2:])
+        return genanki.Model(
+            self._model_id,
+            name,
+            fields=[{'name': field} for field in fields],
+            templates=[{
+                'name': f'{name} Card',
+                'qfmt': f'''
+                    {{{{Audio}}}}
+                    <div class="question">{question}</div>
+                ''',
+                'afmt': f'''
+                    {{{{Audio}}}}
+                    <div class="answer">
+                        <div class="note">{{{{{fields[1]}}}}}</div>
+                        <div class="details">{details}</div>
+                    </div>
+                '''
+            }],
+            css=self.shared_css(self.get_custom_css())
+        )
+
+
+class IntervalDeck(CombinationDeck):
+    INTERVALS = [
+        'Minor 2nd', 'Major 2nd', 'Minor 3rd', 'Major 3rd', 'Perfect 4th', 'Tritone',
+        'Perfect 5th', 'Minor 6th', 'Major 6th', 'Minor 7th', 'Major 7th', 'Octave'
+    ]
+    NOTE_SPACING = 0.6  # seconds between the notes of a melodic interval
+
+    def __init__(self, metadata: DeckMetadata, melodic: bool = False, audio_format: str = 'mp3',
+                 bank: NoteBank | None = None):
+        super().__init__(metadata, audio_format, bank)
+        self.melodic = melodic
+
+    def create_model(self) -> genanki.Model:
+        return self._create_combination_model(
+            'Interval Training', 'What interval is this?', ['Audio', 'Interval', 'Notes']
+        )
+
+    def generate_cards(self) -> list[genanki.Note]:
+        model = self.create_model()
+        notes = []
+        kind = 'melodic' if self.melodic else 'harmonic'
+
+        for semitones, interval in enumerate(self.INTERVALS, start=1):
+            for low, high in zip(self.note_names, self.note_names[semitones:]):
+                audio = self._save_combination(
+                    self._audio_filename(f'interval_{kind}', [low, high]),
+                    [low, high],
+                    [0, self.NOTE_SPACING] if self.melodic else None
+                )
+                notes.append(genanki.Note(
+                    model=model,
+                    fields=[audio, interval, f'{low} - {high}'],
+                    guid=genanki.guid_for(self._model_id, kind, low, high),
+                    tags=self.metadata.tags + ['interval', kind]
+                ))
+
+        return notes
+
+
+class ChordDeck(CombinationDeck):
+    CHORDS = {
+        'Major': [0, 4, 7],
+        'Minor': [0, 3, 7],
+        'Diminished': [0, 3, 6],
+        'Augmented': [0, 4, 8],
+        'Major 7th': [0, 4, 7, 11],
+        'Minor 7th': [0, 3, 7, 10],
+        'Dominant 7th': [0, 4, 7, 10],
+    }
+    INVERSIONS = ['Root position', '1st inversion', '2nd inversion', '3rd inversion']
+
+    def create_model(self) -> genanki.Model:
+        return self._create_combination_model(
+            'Chord Training', 'What chord is this?', ['Audio', 'Chord', 'Inversion', 'Notes']
+        )
+
+    def generate_cards(self) -> list[genanki.Note]:
+        model = self.create_model()
+        notes = []
+        seen = set()
+
+        for quality, intervals in self.CHORDS.items():
+            for inversion in range(len(intervals)):
+                # Raise the lowest notes by an octave for each inversion
+                voicing = sorted(intervals[inversion:] + [interval + 12 for interval in intervals[:inversion]])
+                for root_idx, root in enumerate(self.note_names):
+                    indexes = [root_idx + interval for interval in voicing]
+                    if indexes[-1] >= len(self.note_names):
+                        break
+                    chord_notes = [self.note_names[idx] for idx in indexes]
+                    if tuple(chord_notes) in seen:  # Inversions of augmented chords repeat the same notes
+                        continue
+                    seen.add(tuple(chord_notes))
+                    chord_root = self.note_names[root_idx + 12] if inversion else root
+                    audio = self._save_combination(self._audio_filename('chord', chord_notes), chord_notes)
+                    notes.append(genanki.Note(
+                        model=model,
+                        fields=[audio, f'{chord_root[:-1]} {quality}', self.INVERSIONS[inversion], ' '.join(chord_notes)],
+                        guid=genanki.guid_for(self._model_id, quality, inversion, root),
+                        tags=self.metadata.tags + ['chord']
+                    ))
+
+        return notes
+
+
+class MelodyDeck(CombinationDeck):
+    NOTE_SPACING = 0.45  # seconds between melody notes
+    SCALE = [0, 2, 4, 5, 7, 9, 11, 12]  # major scale degrees melodies are drawn from
+    MAX_ATTEMPTS = 100  # random draws per requested melody before giving up on finding new ones
+
+    def __init__(self, metadata: DeckMetadata, count: int = 100, length: int = 4, seed: int = 0,
+                 audio_format: str = 'mp3', bank: NoteBank | None = None):
+        super().__init__(metadata, audio_format, bank)
+        self.count = count
+        self.length = length
+        self.seed = seed
+        # Melodies from different roots can coincide, so this only bounds the number of distinct ones
+        most = len(self._roots()) * len(self.SCALE) ** length
+        if count > most:
+            raise ValueError(f"Cannot draw {count} distinct melodies of length {length}, "
+                             f"the note range allows at most {most}")
+
+    def _roots(self) -> list[str]:
+        return self.note_names[:len(self.note_names) - self.SCALE[-1]]
+
+    def create_model(self) -> genanki.Model:
+        return self._create_combination_model(
+            'Melody Training', 'Which notes make up this melody?', ['Audio', 'Notes', 'Key']
+        )
+
+    def generate_cards(self) -> list[genanki.Note]:
+        model = self.create_model()
+        notes = []
+        rng = random.Random(self.seed)
+        roots = self._roots()
+        seen = set()
+
+        for _ in range(self.count * self.MAX_ATTEMPTS):
+            if len(notes) == self.count:
+                break
+            root = rng.choice(roots)
+            root_idx = self.note_names.index(root)
+            melody = [self.note_names[root_idx + rng.choice(self.SCALE)] for _ in range(self.length)]
+            if tuple(melody) in seen:
+                continue
+            seen.add(tuple(melody))
+            audio = self._save_combination(
+                self._audio_filename('melody', melody),
+                melody,
+                [i * self.NOTE_SPACING for i in range(self.length)]
+            )
+            notes.append(genanki.Note(
+                model=model,
+                fields=[audio, ' '.join(melody), f'{root[:-1]} major'],
+                guid=genanki.guid_for(self._model_id, *melody),
+                tags=self.metadata.tags + ['melody']
+            ))
+        if len(notes) < self.count:
+            raise ValueError(f"Found only {len(notes)} distinct melodies of length {self.length} "
+                             f"after {self.count * self.MAX_ATTEMPTS} draws, fewer than the {self.count} requested")
+
+        return notes
 
 
 if __name__ == "__main__":
+    options = BuildOptions.from_args()
+
     deck = PerfectPitchDeck(
         DeckMetadata(
             title="Perfect Pitch Training",
@@ -174,5 +467,77 @@ if __name__ == "__main__":
             version="1.0"
         )
     )
-    deck.save_deck("perfect_pitch_training.apkg")
-    deck.cleanup()
\ No newline at end of file
+    deck.save_deck("perfect_pitch_training.apkg", options)
+
+    # Reference pitch and tuning variants, plus timbre variants at A4 = 440 Hz equal temperament
+    variants = [(a4, tuning, 'piano') for a4 in (432, 440, 442) for tuning in TUNING_SYSTEMS]
+    variants += [(440, 'equal', timbre) for timbre in TIMBRES if timbre != 'piano']
+    variant_decks = []
+    for a4, tuning, timbre in variants:
+        if (a4, tuning, timbre) == (440, 'equal', 'piano'):
+            continue
+        variant_deck = PerfectPitchDeck(
+            DeckMetadata(
+                title=f"Perfect Pitch Training ({a4} Hz, {tuning}, {timbre})",
+                tags=["music", "ear-training", "perfect-pitch", tuning, timbre],
+                description=f"Perfect pitch ear training with A4 = {a4} Hz in {tuning} tuning and a {timbre} timbre.",
+                version="1.0"
+            ),
+            a4_frequency=a4,
+            tuning=tuning,
+            timbre=timbre,
+            harmonic_bank=deck.harmonic_bank
+        )
+        variant_deck.save_deck(f"perfect_pitch_{a4}_{tuning}_{timbre}.apkg", options)
+        variant_decks.append(variant_deck)
+
+    # Clips are shared between the variants, so only clean up once all of them are saved
+    for pitch_deck in [deck, *variant_decks]:
+        pitch_deck.cleanup()
+
+    # Interval, chord and melody decks mix cards from one shared bank of rendered notes
+    interval_deck = IntervalDeck(
+        DeckMetadata(
+            title="Interval Training",
+            tags=["music", "ear-training", "intervals"],
+            description="Identify harmonic intervals from C3 to B5.",
+            version="1.0"
+        )
+    )
+    bank = interval_deck.bank
+    melodic_interval_deck = IntervalDeck(
+        DeckMetadata(
+            title="Melodic Interval Training",
+            tags=["music", "ear-training", "intervals"],
+            description="Identify ascending melodic intervals from C3 to B5.",
+            version="1.0"
+        ),
+        melodic=True,
+        bank=bank
+    )
+    chord_deck = ChordDeck(
+        DeckMetadata(
+            title="Chord Training",
+            tags=["music", "ear-training", "chords"],
+            description="Identify triads and seventh chords and their inversions.",
+            version="1.0"
+        ),
+        bank=bank
+    )
+    melody_deck = MelodyDeck(
+        DeckMetadata(
+            title="Melody Dictation",
+            tags=["music", "ear-training", "melody"],
+            description="Name the notes of short melodies drawn from major scales.",
+            version="1.0"
+        ),
+        bank=bank
+    )
+    for combination_deck, output_filename in [
+        (interval_deck, "interval_training.apkg"),
+        (melodic_interval_deck, "melodic_interval_training.apkg"),
+        (chord_deck, "chord_training.apkg"),
+        (melody_deck, "melody_dictation.apkg"),
+    ]:
+        combination_deck.save_deck(output_filename, options)
+        combination_deck.cleanup()
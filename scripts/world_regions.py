@@ -1,14 +1,45 @@
-from base import AnkiDeck, DeckMetadata
+from base import (AnkiDeck, BuildOptions, DeckMetadata, CACHE_PATH, Pipeline, PipelineStage, process_cache,
+                  source_digest)
+from metrics import BuildMetrics
 import genanki
 import geopandas as gpd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PathCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.path import Path as PlotPath
+import numpy as np
 import requests
 from io import BytesIO
+import functools
+import hashlib
+import math
 import os
+import threading
 import pandas as pd
-from typing import Optional
+from pathlib import Path
+from PIL import Image, ImageColor, ImageDraw
+import shapely
+from shapely.geometry import box
+from shapely.geometry.base import BaseGeometry
+from typing import Iterator, Optional, Sequence
 from dataclasses import dataclass
 
+WORLD_DATA_URL = "https://naturalearth.s3.amazonaws.com/110m_cultural/ne_110m_admin_0_countries.zip"
+FLAG_URL = "https://flagcdn.com/w160/{code}.png"
+SOURCE_DIGEST = source_digest(__file__)  # Part of rendered image keys, so editing the renderers invalidates them
+PROJECTED_CRS = 'ESRI:54009'
+# Natural Earth NAME_<code> columns built as variants of the English deck, with their names in that language
+LANGUAGES = {'DE': 'Deutsch', 'FR': 'Français', 'ES': 'Español', 'JA': '日本語'}
+BACKGROUND_COLOR = '#1a1a1a'
+NEIGHBOR_COLOR = '#404040'
+NEIGHBOR_WIDTH = 1  # points
+FILL_COLOR, FILL_ALPHA = '#ffffff', 0.9
+HIGHLIGHT_COLOR, HIGHLIGHT_ALPHA = '#ff4444', 0.5
+BOUNDARY_COLOR = '#ffffff'
+BOUNDARY_WIDTH = 2  # points
+RENDERERS = ('pillow', 'matplotlib')
+
 
 @dataclass
 class RegionData:
@@ -19,16 +50,302 @@ class RegionData:
     flag: Optional[bytes] = None
 
 
+class BasemapTileCache:
+    """Neighbor boundary tiles of the projected world, rendered on first use and cached on disk across builds."""
+    TILE_SIZE = 512  # pixels
+    MAX_ZOOM = 10
+    MEMORY_TILES = 128  # Decoded tiles kept in memory, about 100 MB
+
+    def __init__(self, world_proj: gpd.GeoDataFrame, cache_path: Path = CACHE_PATH / 'basemap',
+                 metrics: Optional[BuildMetrics] = None):
+        self.world_proj = world_proj
+        self.metrics = metrics
+        self.min_x, self.min_y, self.max_x, self.max_y = world_proj.total_bounds
+        self.world_size = max(self.max_x - self.min_x, self.max_y - self.min_y)
+
+        # Tiles are keyed by their style and the geometry they were drawn from, so a new dataset or
+        # changed colors never reuse stale tiles
+        digest = hashlib.md5(repr((self.TILE_SIZE, BACKGROUND_COLOR, NEIGHBOR_COLOR, NEIGHBOR_WIDTH)).encode())
+        for geometry in world_proj.geometry.to_wkb():
+            digest.update(geometry)
+        self.tile_path = cache_path / digest.hexdigest()[:16]
+        world_proj.sindex  # Build the spatial index up front rather than racing to build it in render threads
+        # Neighboring regions compose from the same tiles, so recently used ones are kept decoded
+        self._decoded_tile = functools.lru_cache(maxsize=self.MEMORY_TILES)(self._load_tile)
+
+    def _tile_extent(self, zoom: int, row: int, col: int) -> tuple[float, float, float, float]:
+        side = self.world_size / 2 ** zoom
+        x0 = self.min_x + col * side
+        y1 = self.max_y - row * side
+        return x0, y1 - side, x0 + side, y1
+
+    def _render_tile(self, zoom: int, row: int, col: int) -> Image.Image:
+        x0, y0, x1, y1 = self._tile_extent(zoom, row, col)
+        inches = self.TILE_SIZE / 100
+        fig = Figure(figsize=(inches, inches), dpi=100, facecolor=BACKGROUND_COLOR)
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.set_facecolor(BACKGROUND_COLOR)
+
+        visible = self.world_proj.iloc[self.world_proj.sindex.query(box(x0, y0, x1, y1))]
+        if not visible.empty:
+            visible.boundary.plot(ax=ax, color=NEIGHBOR_COLOR, linewidth=NEIGHBOR_WIDTH)
+
+        ax.set_xlim(x0, x1)
+        ax.set_ylim(y0, y1)
+        ax.set_aspect('auto')
+        ax.axis('off')
+
+        img_buffer = BytesIO()
+        fig.savefig(img_buffer, format='png', dpi=100, facecolor=BACKGROUND_COLOR)
+        img_buffer.seek(0)
+        return Image.open(img_buffer).convert('RGB')
+
+    def get_tile(self, zoom: int, row: int, col: int) -> Image.Image:
+        return self._decoded_tile(zoom, row, col)
+
+    def _load_tile(self, zoom: int, row: int, col: int) -> Image.Image:
+        filepath = self.tile_path / str(zoom) / f'{row}_{col}.png'
+        if filepath.exists():  # Only render tiles that are not cached yet
+            if self.metrics:
+                self.metrics.increment('cache_hits_total', cache='basemap_tiles')
+            return Image.open(filepath).convert('RGB')
+
+        if self.metrics:
+            self.metrics.increment('cache_misses_total', cache='basemap_tiles')
+        tile = self._render_tile(zoom, row, col)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name so concurrent renders never read a partial tile
+        temp_path = filepath.with_suffix(f'.{threading.get_ident()}.tmp')
+        tile.save(temp_path, format='PNG')
+        os.replace(temp_path, filepath)
+        return tile
+
+    def compose(self, bounds: tuple[float, float, float, float], width: int, height: int) -> Image.Image:
+        """Crop and stitch cached tiles into a width x height image covering the projected bounds."""
+        x0, y0, x1, y1 = bounds
+        zoom = math.ceil(math.log2(max(width * self.world_size / ((x1 - x0) * self.TILE_SIZE), 1)))
+        zoom = min(zoom, self.MAX_ZOOM)
+        side = self.world_size / 2 ** zoom
+        scale = self.TILE_SIZE / side  # pixels per projected unit
+
+        first_col = math.floor((x0 - self.min_x) / side)
+        last_col = math.floor((x1 - self.min_x) / side)
+        first_row = math.floor((self.max_y - y1) / side)
+        last_row = math.floor((self.max_y - y0) / side)
+
+        mosaic = Image.new(
+            'RGB',
+            ((last_col - first_col + 1) * self.TILE_SIZE, (last_row - first_row + 1) * self.TILE_SIZE),
+            BACKGROUND_COLOR
+        )
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                mosaic.paste(
+                    self.get_tile(zoom, row, col),
+                    ((col - first_col) * self.TILE_SIZE, (row - first_row) * self.TILE_SIZE)
+                )
+
+        origin_x = self.min_x + first_col * side
+        origin_y = self.max_y - first_row * side
+        crop = (
+            (x0 - origin_x) * scale, (origin_y - y1) * scale,
+            (x1 - origin_x) * scale, (origin_y - y0) * scale,
+        )
+        return mosaic.resize((width, height), Image.Resampling.BILINEAR, box=crop)
+
+
+class OutlineRasterizer:
+    """Fills and strokes a region's polygons with Pillow, without matplotlib's figure machinery.
+
+    Geometries are simplified to a fraction of a pixel, as matplotlib does
+    with paths, and mapped to pixels with NumPy. Drawing happens at
+    `supersample` times the size and is box filtered down, which antialiases
+    the edges. Sizes, colors and line widths match the matplotlib renderer.
+    """
+    MAX_SIZE = (775, 770)  # pixels, the axes area of the 10 inch, 100 dpi figure the matplotlib renderer saves
+    PIXELS_PER_POINT = 100 / 72
+    SIMPLIFY_PIXELS = 0.25  # Vertices closer than this to the simplified outline are dropped
+    JOINT_DEGREES = 30  # Vertices turning more sharply than this get a round join
+
+    def __init__(self, basemap: BasemapTileCache, supersample: int = 2):
+        self.basemap = basemap
+        self.supersample = supersample
+
+    def render(self, geometries: Sequence[BaseGeometry], include_neighbors: bool = False,
+               highlighted: bool = False) -> bytes:
+        bounds = np.array([geometry.bounds for geometry in geometries])
+        x0, y0 = bounds[:, :2].min(axis=0)
+        x1, y1 = bounds[:, 2:].max(axis=0)
+        padding = max(x1 - x0, y1 - y0) * 0.2
+        view = (x0 - padding, y0 - padding, x1 + padding, y1 + padding)
+        view_width = view[2] - view[0]
+        view_height = view[3] - view[1]
+        scale = min(self.MAX_SIZE[0] / view_width, self.MAX_SIZE[1] / view_height)
+        size = (max(round(view_width * scale), 1), max(round(view_height * scale), 1))
+        canvas_size = (size[0] * self.supersample, size[1] * self.supersample)
+
+        simplified = shapely.simplify(np.asarray(geometries, dtype=object), self.SIMPLIFY_PIXELS / scale,
+                                      preserve_topology=False)
+        pixel_scale = np.array([scale, -scale]) * self.supersample
+        origin = np.array([view[0], view[3]])
+        polygons = [
+            [(np.asarray(ring.coords)[:, :2] - origin) * pixel_scale for ring in (polygon.exterior, *polygon.interiors)]
+            for geometry in simplified for polygon in getattr(geometry, 'geoms', [geometry]) if not polygon.is_empty
+        ]
+
+        if include_neighbors:
+            # Upscaled without interpolation, so the box filter at the end gives the composed pixels back
+            image = self.basemap.compose(view, *size).resize(canvas_size, Image.Resampling.NEAREST)
+        else:
+            image = Image.new('RGB', canvas_size, BACKGROUND_COLOR)
+
+        color, alpha = (HIGHLIGHT_COLOR, HIGHLIGHT_ALPHA) if highlighted else (FILL_COLOR, FILL_ALPHA)
+        fill = (*ImageColor.getrgb(color), round(alpha * 255))
+        draw = ImageDraw.Draw(image, 'RGBA')  # Blends the translucent fill into what is underneath
+        with_holes = []
+        for rings in polygons:
+            if len(rings) > 1:
+                with_holes.append(rings)
+            else:
+                draw.polygon(rings[0].ravel().tolist(), fill=fill)
+        if with_holes:
+            # Holes cannot be blended away again, so these polygons are filled through a mask instead
+            mask = Image.new('L', canvas_size, 0)
+            mask_draw = ImageDraw.Draw(mask)
+            for exterior, *interiors in with_holes:
+                mask_draw.polygon(exterior.ravel().tolist(), fill=fill[3])
+                for interior in interiors:
+                    mask_draw.polygon(interior.ravel().tolist(), fill=0)
+            image.paste(fill[:3], mask=mask)
+
+        width = max(round(BOUNDARY_WIDTH * self.PIXELS_PER_POINT * self.supersample), 1)
+        for rings in polygons:
+            for ring in rings:
+                draw.line(ring.ravel().tolist(), fill=BOUNDARY_COLOR, width=width)
+                self._round_joints(draw, ring, width)
+        if self.supersample > 1:
+            image = image.reduce(self.supersample)
+
+        img_buffer = BytesIO()
+        image.save(img_buffer, format='PNG')
+        return img_buffer.getvalue()
+
+    def _round_joints(self, draw: ImageDraw.ImageDraw, ring: np.ndarray, width: int) -> None:
+        """Cover the notches Pillow leaves at sharp corners, like matplotlib's round line joins."""
+        incoming = ring[1:-1] - ring[:-2]
+        outgoing = ring[2:] - ring[1:-1]
+        cosine = (incoming * outgoing).sum(axis=1) / (
+            np.linalg.norm(incoming, axis=1) * np.linalg.norm(outgoing, axis=1) + 1e-12
+        )
+        radius = width / 2
+        for x, y in ring[1:-1][cosine < math.cos(math.radians(self.JOINT_DEGREES))]:
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=BOUNDARY_COLOR)
+
+
+class RegionPlotSession:
+    """Matplotlib renderer that converts every region to Paths once and reuses one Agg figure per thread.
+
+    An image only swaps the paths, colors, basemap and axis limits of the
+    figure's existing artists before drawing, instead of building a new
+    figure and converting shapely geometry through GeoSeries.plot each
+    time. The canvas is cropped to the axes, as savefig with
+    bbox_inches='tight' does for these figures.
+    """
+    FIGURE_INCHES = 10
+
+    def __init__(self, world_proj: gpd.GeoDataFrame):
+        self.paths: dict[str, list[PlotPath]] = {}
+        for name, geometry in zip(world_proj.NAME, world_proj.geometry):
+            self.paths.setdefault(name, []).extend(
+                self._polygon_path(polygon) for polygon in getattr(geometry, 'geoms', [geometry])
+                if not polygon.is_empty
+            )
+        self._local = threading.local()  # Artists are not thread-safe, so each render thread has its own figure
+
+    @staticmethod
+    def _polygon_path(polygon: BaseGeometry) -> PlotPath:
+        # Holes are subpaths of the exterior, as in the patches geopandas plots
+        return PlotPath.make_compound_path(
+            *(PlotPath(np.asarray(ring.coords)[:, :2]) for ring in (polygon.exterior, *polygon.interiors))
+        )
+
+    def _artists(self) -> tuple:
+        artists = getattr(self._local, 'artists', None)
+        if artists is None:
+            fig = Figure(figsize=(self.FIGURE_INCHES, self.FIGURE_INCHES), facecolor=BACKGROUND_COLOR)
+            FigureCanvasAgg(fig)
+            ax = fig.subplots()
+            ax.set_facecolor(BACKGROUND_COLOR)
+            ax.axis('off')
+            basemap = ax.imshow(np.zeros((1, 1, 3), dtype=np.uint8), interpolation='bilinear', zorder=0)
+            fill = PathCollection([], linewidths=1, zorder=1)
+            boundary = PathCollection([], facecolors='none', edgecolors=BOUNDARY_COLOR, linewidths=BOUNDARY_WIDTH,
+                                      zorder=2)
+            ax.add_collection(fill, autolim=False)
+            ax.add_collection(boundary, autolim=False)
+            ax.set_aspect('equal')
+            artists = self._local.artists = (ax, basemap, fill, boundary)
+        return artists
+
+    def render(self, region_name: str, view: tuple[float, float, float, float], basemap: Optional[Image.Image],
+               highlighted: bool = False) -> bytes:
+        ax, basemap_image, fill, boundary = self._artists()
+        paths = self.paths[region_name]
+        color = to_rgba(HIGHLIGHT_COLOR, HIGHLIGHT_ALPHA) if highlighted else to_rgba(FILL_COLOR, FILL_ALPHA)
+        fill.set_paths(paths)
+        fill.set_facecolor(color)
+        fill.set_edgecolor(color)
+        boundary.set_paths(paths)
+        basemap_image.set_visible(basemap is not None)
+        if basemap is not None:
+            basemap_image.set_data(np.asarray(basemap))
+            basemap_image.set_extent((view[0], view[2], view[1], view[3]))
+        ax.set_xlim(view[0], view[2])
+        ax.set_ylim(view[1], view[3])
+
+        canvas = ax.figure.canvas
+        canvas.draw()
+        width, height = canvas.get_width_height()
+        # Sizes are truncated like savefig's, so images come out the same size as before
+        left, top = round(ax.bbox.x0), round(height - ax.bbox.y1)
+        crop = (left, top, left + int(ax.bbox.width), top + int(ax.bbox.height))
+        image = Image.frombuffer('RGBA', (width, height), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        img_buffer = BytesIO()
+        image.crop(crop).convert('RGB').save(img_buffer, format='PNG')
+        return img_buffer.getvalue()
+
+
 class WorldRegionsDeck(AnkiDeck):
-    def __init__(self, metadata: DeckMetadata):
+    IMAGE_SIZE = 1000  # pixels along the longest side of the answer basemap, for the matplotlib renderer
+
+    def __init__(self, metadata: DeckMetadata, language: Optional[str] = None, renderer: str = 'pillow'):
         super().__init__(metadata)
-        self.world = self._load_world_data()
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown renderer: {renderer}. Expected one of {list(RENDERERS)}")
+        self.renderer = renderer
+        # Kept for the life of the process, so watch mode rebuilds skip the download and projection, and
+        # language variants built after the first deck reuse its rendered images and flags
+        self.world = process_cache(('world', WORLD_DATA_URL), self._load_world_data)
+        self.world_proj = process_cache(('world_proj', WORLD_DATA_URL, PROJECTED_CRS),
+                                        lambda: self.world.to_crs(PROJECTED_CRS))
+        self.basemap = BasemapTileCache(self.world_proj, metrics=self.metrics)
+        self.rasterizer = OutlineRasterizer(self.basemap)
         self.css = self._get_custom_css()
+        self.display_names = self._display_names(language)
+
+    def _display_names(self, language: Optional[str]) -> dict[str, str]:
+        """English region name -> name shown on the card, falling back to English where a translation is missing"""
+        if language is None:
+            return {}
+        column = f'NAME_{language.upper()}'
+        if column not in self.world.columns:
+            raise ValueError(f"No {column} column in the world data for language {language!r}")
+        return {name: localized for name, localized in zip(self.world['NAME'], self.world[column])
+                if isinstance(localized, str) and localized}
 
     @staticmethod
     def _load_world_data() -> gpd.GeoDataFrame:
-        url = "https://naturalearth.s3.amazonaws.com/110m_cultural/ne_110m_admin_0_countries.zip"
-        return gpd.read_file(url)
+        return gpd.read_file(WORLD_DATA_URL)
 
     def create_model(self) -> genanki.Model:
         return genanki.Model(
@@ -51,7 +368,7 @@ class WorldRegionsDeck(AnkiDeck):
                     </div>
                 ''',
             }],
-            css=self.css
+            css=self.shared_css(self.css)
         )
 
     def _get_custom_css(self) -> str:
@@ -110,125 +427,120 @@ class WorldRegionsDeck(AnkiDeck):
 
     def _create_country_image(self, region_name: str, include_neighbors: bool = False, highlighted: bool = False) -> \
     Optional[bytes]:
-        country = self.world[self.world.NAME == region_name]
-        if country.empty:
-            return None
+        key = ('world_region_image', WORLD_DATA_URL, SOURCE_DIGEST, region_name, include_neighbors, highlighted,
+               self.renderer)
+
+        def render() -> Optional[bytes]:
+            with self.metrics.timer('render_seconds'):
+                return self._render_country_image(region_name, include_neighbors, highlighted)
 
-        projected_crs = 'ESRI:54009'
-        country_proj = country.to_crs(projected_crs)
-        world_proj = self.world.to_crs(projected_crs)
+        return process_cache(key, render)
 
+    def _render_country_image(self, region_name: str, include_neighbors: bool, highlighted: bool) -> Optional[bytes]:
+        country_proj = self.world_proj[self.world_proj.NAME == region_name]
+        if country_proj.empty:
+            return None
+        if self.renderer == 'pillow':
+            return self.rasterizer.render(list(country_proj.geometry), include_neighbors, highlighted)
+        return self._plot_country_image(region_name, country_proj, include_neighbors, highlighted)
+
+    def _plot_country_image(self, region_name: str, country_proj: gpd.GeoDataFrame, include_neighbors: bool,
+                            highlighted: bool) -> bytes:
         bounds = country_proj.geometry.total_bounds
         width = bounds[2] - bounds[0]
         height = bounds[3] - bounds[1]
         padding = max(width, height) * 0.2
+        view = (bounds[0] - padding, bounds[1] - padding, bounds[2] + padding, bounds[3] + padding)
 
-        fig, ax = plt.subplots(figsize=(10, 10), facecolor='#1a1a1a')
-        ax.set_facecolor('#1a1a1a')
-
+        basemap = None
         if include_neighbors:
-            buffer_distance = max(width, height) * 0.5
-            buffered = country_proj.geometry.buffer(buffer_distance)
-            neighbors = world_proj[world_proj.geometry.intersects(buffered.iloc[0])]
-            neighbors[~neighbors.NAME.eq(region_name)].boundary.plot(
-                ax=ax, color='#404040', linewidth=1
+            # Neighbors come from the shared basemap instead of being redrawn for every country
+            view_width = view[2] - view[0]
+            view_height = view[3] - view[1]
+            scale = self.IMAGE_SIZE / max(view_width, view_height)
+            basemap = self.basemap.compose(
+                view, max(round(view_width * scale), 1), max(round(view_height * scale), 1)
             )
 
-        if highlighted:
-            country_proj.plot(ax=ax, color='#ff4444', alpha=0.5)
-            country_proj.boundary.plot(ax=ax, color='#ffffff', linewidth=2)
-        else:
-            country_proj.plot(ax=ax, color='#ffffff', alpha=0.9)
-            country_proj.boundary.plot(ax=ax, color='#ffffff', linewidth=2)
-
-        ax.set_xlim([bounds[0] - padding, bounds[2] + padding])
-        ax.set_ylim([bounds[1] - padding, bounds[3] + padding])
-        ax.axis('off')
-
-        img_buffer = BytesIO()
-        plt.savefig(
-            img_buffer, format='png', bbox_inches='tight', pad_inches=0,
-            facecolor='#1a1a1a', edgecolor='none'
-        )
-        plt.close()
-        return img_buffer.getvalue()
+        session = process_cache(('plot_session', WORLD_DATA_URL, PROJECTED_CRS, SOURCE_DIGEST),
+                                lambda: RegionPlotSession(self.world_proj))
+        return session.render(region_name, view, basemap, highlighted)
 
     def _get_country_flag(self, region_code: str) -> Optional[bytes]:
         try:
-            url = f"https://flagcdn.com/w160/{region_code.lower()}.png"
-            response = requests.get(url)
+            url = FLAG_URL.format(code=region_code.lower())
+            with self.metrics.timer('fetch_seconds'):
+                response = requests.get(url)
             return response.content
         except:
+            self.metrics.increment('fetch_errors_total')
             return None
 
-    def _get_region_data(self, region_name: str, region_code: str) -> Optional[RegionData]:
+    def _render_region(self, region: tuple[str, str]) -> Optional[RegionData]:
+        region_name, region_code = region
         outline_q = self._create_country_image(region_name)
         if outline_q is None:
             return None
-
         outline_a = self._create_country_image(region_name, include_neighbors=True, highlighted=True)
-        flag = self._get_country_flag(region_code)
-
-        return RegionData(
-            name=region_name,
-            code=region_code,
-            outline_q=outline_q,
-            outline_a=outline_a,
-            flag=flag
+        return RegionData(name=region_name, code=region_code, outline_q=outline_q, outline_a=outline_a)
+
+    def _fetch_flag(self, country_data: RegionData) -> RegionData:
+        country_data.flag = process_cache(('flag', FLAG_URL.format(code=country_data.code.lower())),
+                                          lambda: self._get_country_flag(country_data.code))
+        return country_data
+
+    def _write_media(self, country_data: RegionData) -> RegionData:
+        with open(f'outline_q_{country_data.code}.png', 'wb') as f:
+            f.write(country_data.outline_q)
+        with open(f'outline_a_{country_data.code}.png', 'wb') as f:
+            f.write(country_data.outline_a)
+        if country_data.flag:
+            with open(f'flag_{country_data.code}.png', 'wb') as f:
+                f.write(country_data.flag)
+        return country_data
+
+    def generate_cards(self) -> Iterator[genanki.Note]:
+        regions = (
+            (row['NAME'], row['ISO_A2']) for _, row in self.world.iterrows()
+            if not (pd.isna(row['ISO_A2']) or row['ISO_A2'] == '-99')
         )
-
-    def generate_cards(self) -> list[genanki.Note]:
-        notes = []
-
-        for idx, row in self.world.iterrows():
-            region_name = row['NAME']
-            region_code = row['ISO_A2']
-
-            if pd.isna(region_code) or region_code == '-99':
-                continue
-
-            country_data = self._get_region_data(region_name, region_code)
-            if country_data is None:
-                continue
-
-            # Save media files
+        # Rendering, flag downloads and file writes overlap instead of running one country at a time
+        pipeline = Pipeline([
+            PipelineStage('render', self._render_region, workers=os.cpu_count() or 1),
+            PipelineStage('fetch', self._fetch_flag, workers=8),
+            PipelineStage('write', self._write_media, workers=2),
+        ], metrics=self.metrics, worker=self.worker)
+
+        model = self.create_model()
+        for country_data in pipeline.run(regions):
+            region_code = country_data.code
             q_filename = f'outline_q_{region_code}.png'
-            with open(q_filename, 'wb') as f:
-                f.write(country_data.outline_q)
-            self.media_files.append(q_filename)
-
             a_filename = f'outline_a_{region_code}.png'
-            with open(a_filename, 'wb') as f:
-                f.write(country_data.outline_a)
-            self.media_files.append(a_filename)
+            self.media_files.extend([q_filename, a_filename])
 
+            display_name = self.display_names.get(country_data.name, country_data.name)
             flag_html = ''
             if country_data.flag:
                 flag_filename = f'flag_{region_code}.png'
-                with open(flag_filename, 'wb') as f:
-                    f.write(country_data.flag)
                 self.media_files.append(flag_filename)
                 flag_html = f'<img src="{flag_filename}" class="country-flag">'
 
-            note = genanki.Note(
-                model=self.create_model(),
+            yield genanki.Note(
+                model=model,
                 fields=[
                     f'<img src="{q_filename}">',
                     f'''
                     <img src="{a_filename}" class="outline-image">
                     <div class="flag-name-container">
                         {flag_html}
-                        <span class="country-name">{country_data.name}</span>
+                        <span class="country-name">{display_name}</span>
                     </div>
                     '''
                 ]
             )
-            notes.append(note)
-
-        return notes
-
 
 if __name__ == "__main__":
+    options = BuildOptions.from_args()
     metadata = DeckMetadata(
         title="World Regions",
         tags=["geography", "territories", "regions", "maps"],
@@ -237,8 +549,24 @@ if __name__ == "__main__":
     )
 
     deck = WorldRegionsDeck(metadata)
-    deck.save_deck("world_regions.apkg")
+    deck.save_deck("world_regions.apkg", options)
+
+    # Variants only differ in the names, so their images come from the process cache instead of being rendered again
+    decks = [deck]
+    for language, language_name in LANGUAGES.items():
+        variant = WorldRegionsDeck(
+            DeckMetadata(
+                title=f"World Regions ({language_name})",
+                tags=[*metadata.tags, language.lower()],
+                description=f"{metadata.description}, with region names in {language_name}",
+                version=metadata.version,
+            ),
+            language=language,
+        )
+        variant.save_deck(f"world_regions_{language.lower()}.apkg", options)
+        decks.append(variant)
 
-    # Clean up media files
-    for file in deck.media_files:
-        os.remove(file)
\ No newline at end of file
+    # Clean up media files, which the variants share
+    for file in {file for world_deck in decks for file in world_deck.media_files}:
+        if os.path.exists(file):
+            os.remove(file)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import genanki
+
+from notes import NoteStore
+from verify import media_references
+
+
+@dataclass
+class Shard:
+    deck: genanki.Deck
+    media_files: list[str] = field(default_factory=list)
+    media_bytes: int = 0
+
+
+def shard_deck(deck: genanki.Deck, media_files: Sequence[str], deck_id_for: Callable[[int], int],
+               max_notes: Optional[int] = None, max_media_bytes: Optional[int] = None) -> list[Shard]:
+    """Split a deck into `Parent::Part N` decks bounded by note count and media bytes.
+
+    Notes are assigned in order, so the same deck splits the same way every
+    time, and keep their GUIDs whichever part they land in. Each part gets
+    the media its notes reference; shared media referenced by the models,
+    such as stylesheets, goes into every part and does not count towards
+    the bound. A note whose media alone exceeds the bound gets a part of
+    its own.
+    """
+    paths = {Path(file).name: file for file in media_files}
+    sizes = {name: os.path.getsize(file) for name, file in paths.items()}
+
+    shards: list[Shard] = []
+    shard_names: set[str] = set()
+    model_media: set[str] = set()
+    for note in deck.notes:
+        names = media_references('\x1f'.join(note.fields)) & paths.keys()
+        new_names = sorted(names - shard_names)
+        new_bytes = sum(sizes[name] for name in new_names)
+        current = shards[-1] if shards else None
+        full = current is not None and current.deck.notes and (
+            max_notes is not None and len(current.deck.notes) >= max_notes
+            or max_media_bytes is not None and current.media_bytes + new_bytes > max_media_bytes
+        )
+        if current is None or full:
+            number = len(shards) + 1
+            current = Shard(genanki.Deck(deck_id_for(number), f'{deck.name}::Part {number}', deck.description))
+            current.deck.notes = NoteStore()
+            shards.append(current)
+            shard_names = set()
+            new_names = sorted(names)
+            new_bytes = sum(sizes[name] for name in new_names)
+
+        current.deck.add_note(note)
+        current.media_files.extend(paths[name] for name in new_names)
+        current.media_bytes += new_bytes
+        shard_names.update(new_names)
+        if note.model.model_id not in current.deck.models:
+            current.deck.add_model(note.model)
+            model = note.model
+            model_media |= media_references(model.css + ''.join(t['qfmt'] + t['afmt'] for t in model.templates))
+
+    shared = [paths[name] for name in sorted(model_media & paths.keys())]
+    for shard in shards:
+        shard.media_files.extend(shared)
+    return shards
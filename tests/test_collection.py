@@ -0,0 +1,107 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import genanki
+
+from collection import update_collection
+
+MODEL = genanki.Model(
+    1607392319, 'Test Model',
+    fields=[{'name': 'Question'}, {'name': 'Answer'}],
+    templates=[{'name': 'Card 1', 'qfmt': '{{Question}}', 'afmt': '{{Answer}}'}],
+)
+
+
+def make_deck(answers: list[str], guids: list | None = None) -> genanki.Deck:
+    deck = genanki.Deck(2059400110, 'Test Deck')
+    for number, answer in enumerate(answers):
+        guid = f'note-{number}' if guids is None else guids[number]
+        deck.add_note(genanki.Note(model=MODEL, fields=[f'Question {number}', answer], guid=guid))
+    return deck
+
+
+class UpdateCollectionTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.collection_path = self.directory / 'collection.anki2'
+        self.media_path = self.directory / 'collection.media'
+
+        # genanki writes the legacy schema, with note types and decks as JSON in the col table
+        connection = sqlite3.connect(self.collection_path)
+        genanki.Package(genanki.Deck(1, 'Default')).write_to_db(connection.cursor(), 0, iter(range(1, 10 ** 6)))
+        connection.commit()
+        connection.close()
+
+        self.audio = self.directory / 'audio.mp3'
+        self.audio.write_bytes(b'audio')
+
+    def notes(self) -> dict[str, tuple[int, str]]:
+        connection = sqlite3.connect(self.collection_path)
+        try:
+            return {guid: (note_id, fields) for note_id, guid, fields in
+                    connection.execute('SELECT id, guid, flds FROM notes')}
+        finally:
+            connection.close()
+
+    def card_count(self) -> int:
+        connection = sqlite3.connect(self.collection_path)
+        try:
+            return connection.execute('SELECT count(*) FROM cards').fetchone()[0]
+        finally:
+            connection.close()
+
+    def update(self, deck: genanki.Deck):
+        return update_collection(deck, [str(self.audio)], self.collection_path, self.media_path)
+
+    def test_first_upsert_adds_notes_and_media(self):
+        update = self.update(make_deck(['a', 'b']))
+
+        self.assertEqual((update.added_notes, update.updated_notes, update.unchanged_notes), (2, 0, 0))
+        self.assertEqual(update.copied_media, 1)
+        self.assertEqual(len(self.notes()), 2)
+        self.assertEqual(self.card_count(), 2)
+        self.assertEqual((self.media_path / 'audio.mp3').read_bytes(), b'audio')
+
+    def test_second_upsert_inserts_nothing(self):
+        self.update(make_deck(['a', 'b']))
+        before = self.notes()
+
+        update = self.update(make_deck(['a', 'b']))
+
+        self.assertEqual((update.added_notes, update.updated_notes, update.unchanged_notes), (0, 0, 2))
+        self.assertEqual(update.copied_media, 0)
+        self.assertEqual(self.notes(), before)
+        self.assertEqual(self.card_count(), 2)
+
+    def test_integer_guids_match_stored_text(self):
+        self.update(make_deck(['a', 'b'], guids=[1001, 1002]))
+        before = self.notes()
+
+        update = self.update(make_deck(['a', 'b'], guids=[1001, 1002]))
+
+        self.assertEqual((update.added_notes, update.updated_notes, update.unchanged_notes), (0, 0, 2))
+        self.assertEqual(self.notes(), before)
+        self.assertEqual(before.keys(), {'1001', '1002'})
+        self.assertEqual(self.card_count(), 2)
+
+    def test_changed_notes_are_updated_in_place(self):
+        self.update(make_deck(['a', 'b']))
+        before = self.notes()
+
+        update = self.update(make_deck(['a', 'changed']))
+
+        self.assertEqual((update.added_notes, update.updated_notes, update.unchanged_notes), (0, 1, 1))
+        after = self.notes()
+        self.assertEqual(after.keys(), before.keys())
+        self.assertEqual(after['note-0'], before['note-0'])
+        self.assertEqual(after['note-1'][0], before['note-1'][0])
+        self.assertEqual(after['note-1'][1], 'Question 1\x1fchanged')
+        self.assertEqual(self.card_count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import argparse
+import json
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping
+
+SOUND_REF = re.compile(r'\[sound:(.+?)\]')
+SRC_REF = re.compile(r'<(?:img|script)\b[^>]*?\bsrc\s*=\s*["\']?([^"\'>\s]+)', re.IGNORECASE)
+CSS_URL_REF = re.compile(r'url\(\s*["\']?([^"\')]+)')
+EXTERNAL_REF = re.compile(r'^[a-z][a-z0-9+.-]*:', re.IGNORECASE)  # http:, data: and similar URLs
+COLLECTION_NAMES = ('collection.anki21', 'collection.anki2')
+
+
+def media_references(text: str) -> set[str]:
+    """Media filenames referenced by sound tags, img/script sources or CSS urls."""
+    names = {*SOUND_REF.findall(text), *SRC_REF.findall(text), *CSS_URL_REF.findall(text)}
+    return {name for name in names if not EXTERNAL_REF.match(name)}
+
+
+def rename_media_references(text: str, names: Mapping[str, str]) -> str:
+    """Replace the filenames in sound tags, img/script sources and CSS urls that appear in names."""
+    def rename(match: re.Match) -> str:
+        new_name = names.get(match.group(1))
+        if new_name is None:
+            return match.group(0)
+        start, end = match.start(1) - match.start(0), match.end(1) - match.start(0)
+        return match.group(0)[:start] + new_name + match.group(0)[end:]
+
+    for pattern in (SOUND_REF, SRC_REF, CSS_URL_REF):
+        text = pattern.sub(rename, text)
+    return text
+
+
+@dataclass
+class PackageReport:
+    path: Path
+    notes: int = 0
+    media: int = 0
+    missing_media: list[tuple[str, str]] = field(default_factory=list)  # (guid or model name, filename)
+    missing_entries: list[str] = field(default_factory=list)  # names in the media map without a zip entry
+    orphaned_media: list[str] = field(default_factory=list)
+    duplicate_guids: list[str] = field(default_factory=list)
+    empty_fields: list[tuple[str, str]] = field(default_factory=list)  # (guid, field name)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing_media or self.missing_entries or self.orphaned_media
+                    or self.duplicate_guids or self.empty_fields)
+
+    def format(self) -> str:
+        lines = [f"{self.path.name}: {self.notes} notes, {self.media} media files"]
+        lines += [f"  missing media {name!r} referenced by {owner}" for owner, name in self.missing_media]
+        lines += [f"  media {name!r} has no file in the package" for name in self.missing_entries]
+        lines += [f"  orphaned media {name!r}" for name in self.orphaned_media]
+        lines += [f"  duplicate guid {guid!r}" for guid in self.duplicate_guids]
+        lines += [f"  empty field {name!r} in note {guid}" for guid, name in self.empty_fields]
+        return '\n'.join(lines)
+
+
+def verify_package(path: str | Path) -> PackageReport:
+    """Check an .apkg for dangling or orphaned media, duplicate GUIDs and empty fields.
+
+    Notes are streamed from the collection in one pass with set lookups, so
+    the cost is linear in the size of the note table. Media files whose
+    name starts with an underscore may be used by add-ons or other decks
+    and are never reported as orphaned.
+    """
+    path = Path(path)
+    report = PackageReport(path)
+    with zipfile.ZipFile(path) as package, tempfile.TemporaryDirectory() as temp_dir:
+        entries = set(package.namelist())
+        media_map = json.loads(package.read('media')) if 'media' in entries else {}
+        media_names = set(media_map.values())
+        report.media = len(media_names)
+        report.missing_entries = sorted(name for index, name in media_map.items() if index not in entries)
+
+        collection_name = next((name for name in COLLECTION_NAMES if name in entries), None)
+        if collection_name is None:
+            raise ValueError(f"{path}: no collection database in package")
+        collection_path = Path(temp_dir) / collection_name
+        with package.open(collection_name) as source, open(collection_path, 'wb') as target:
+            shutil.copyfileobj(source, target, 1 << 20)
+
+        connection = sqlite3.connect(collection_path)
+        try:
+            referenced = _verify_notes(connection, media_names, report)
+        finally:
+            connection.close()
+
+    report.orphaned_media = sorted(name for name in media_names - referenced if not name.startswith('_'))
+    return report
+
+
+def _verify_notes(connection: sqlite3.Connection, media_names: set[str], report: PackageReport) -> set[str]:
+    referenced: set[str] = set()
+    field_names: dict[int, list[str]] = {}
+    (models_json,) = connection.execute('SELECT models FROM col').fetchone()
+    for model_id, model in json.loads(models_json).items():
+        field_names[int(model_id)] = [fld['name'] for fld in model['flds']]
+        template_text = model.get('css', '') + ''.join(t['qfmt'] + t['afmt'] for t in model['tmpls'])
+        for name in media_references(template_text):
+            referenced.add(name)
+            if name not in media_names:
+                report.missing_media.append((f"model {model['name']!r}", name))
+
+    seen_guids: set[str] = set()
+    duplicates: set[str] = set()
+    for guid, model_id, fields in connection.execute('SELECT guid, mid, flds FROM notes'):
+        report.notes += 1
+        if guid in seen_guids:
+            duplicates.add(guid)
+        seen_guids.add(guid)
+
+        for name, value in zip(field_names.get(model_id, ()), fields.split('\x1f')):
+            if not value.strip():
+                report.empty_fields.append((guid, name))
+        for name in media_references(fields):
+            referenced.add(name)
+            if name not in media_names:
+                report.missing_media.append((guid, name))
+
+    report.duplicate_guids = sorted(duplicates)
+    return referenced
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify media references, GUIDs and fields of .apkg packages")
+    parser.add_argument('packages', nargs='+', type=Path)
+    args = parser.parse_args()
+
+    failed = False
+    for package_path in args.packages:
+        package_report = verify_package(package_path)
+        print(package_report.format())
+        failed |= not package_report.ok
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,103 @@
+import argparse
+import os
+import re
+import runpy
+import sys
+import time
+import traceback
+from pathlib import Path
+
+from data_deck import DATA_PATH
+
+ROOT_PATH = Path(__file__).parent
+SCRIPTS_PATH = ROOT_PATH / 'scripts'
+POLL_INTERVAL = 0.5  # seconds
+
+
+def _mtimes(paths: list[Path]) -> dict[Path, float]:
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = path.stat().st_mtime
+        except FileNotFoundError:
+            pass
+    return mtimes
+
+
+def _data_files() -> list[Path]:
+    return sorted(path for path in DATA_PATH.rglob('*') if path.is_file()) if DATA_PATH.exists() else []
+
+
+def _shared_modules() -> list[Path]:
+    return sorted(ROOT_PATH.glob('*.py'))
+
+
+def script_inputs(script: Path) -> set[Path]:
+    """The script itself and the data files it names."""
+    source = script.read_text()
+    return {script} | {path for path in _data_files() if re.search(rf'\b{re.escape(path.name)}\b', source)}
+
+
+def build(script: Path, build_args: list[str]) -> None:
+    """Run a deck script as __main__ in this process, reusing loaded modules and process caches."""
+    print(f"Building {script.name}...")
+    start = time.perf_counter()
+    argv = sys.argv
+    sys.argv = [str(script), *build_args]
+    try:
+        runpy.run_path(str(script), run_name='__main__')
+    except SystemExit as e:
+        if e.code:
+            print(f"{script.name} exited with {e.code}")
+    except Exception:
+        traceback.print_exc()
+    else:
+        print(f"Built {script.name} in {time.perf_counter() - start:.1f}s")
+    finally:
+        sys.argv = argv
+
+
+def watch(scripts: list[Path], build_args: list[str], interval: float = POLL_INTERVAL) -> None:
+    """Build the scripts, then rebuild each one whose script or data files change.
+
+    The process stays alive between builds, so imports, downloaded datasets,
+    projected geometries and synthesized audio kept with base.process_cache
+    are reused. A change to a shared module such as base.py restarts the
+    process, since objects built from the old code cannot be trusted.
+    """
+    for script in scripts:
+        build(script, build_args)
+
+    shared = _mtimes(_shared_modules())
+    inputs = {script: _mtimes(sorted(script_inputs(script))) for script in scripts}
+    print(f"Watching {len(scripts)} scripts, press Ctrl+C to stop")
+    while True:
+        time.sleep(interval)
+        if _mtimes(_shared_modules()) != shared:
+            print("Shared module changed, restarting")
+            os.execv(sys.executable, [sys.executable, *sys.argv])
+
+        for script in scripts:
+            current = _mtimes(sorted(script_inputs(script))) if script.exists() else {}
+            if current != inputs[script]:
+                inputs[script] = current
+                if script.exists():
+                    build(script, build_args)
+
+
+if __name__ == "__main__":
+    # Arguments after -- are passed to every build, e.g. `python watch.py scripts/java.py -- --verify`
+    args, build_args = sys.argv[1:], []
+    if '--' in args:
+        args, build_args = args[:args.index('--')], args[args.index('--') + 1:]
+
+    parser = argparse.ArgumentParser(description="Rebuild decks in a long-lived process when their scripts or data change")
+    parser.add_argument('scripts', nargs='*', type=Path, help="Deck scripts to watch (default: all of scripts/)")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="Seconds between checks for changes")
+    parsed = parser.parse_args(args)
+
+    try:
+        watch([script.resolve() for script in parsed.scripts] or sorted(SCRIPTS_PATH.glob('*.py')),
+              build_args, parsed.interval)
+    except KeyboardInterrupt:
+        pass